@@ -1,3 +1,15 @@
+import os
+
 from setuptools import setup
 
-setup()
+# Modules compiled to C extensions with mypyc when KNOWLEDGE_MCP_COMPILE=1.
+# The pure-Python sources stay importable, so compilation is optional.
+COMPILED_MODULES = ["src/utils/chunking.py"]
+
+ext_modules = []
+if os.environ.get("KNOWLEDGE_MCP_COMPILE") == "1":
+    from mypyc.build import mypycify
+
+    ext_modules = mypycify(COMPILED_MODULES)
+
+setup(ext_modules=ext_modules)
@@ -16,6 +16,10 @@ class StorageSettings(BaseSettings):
     documents_path: Path = Path("./data/documents")
     vector_db_path: Path = Path("./data/chromadb")
     model_cache_path: Path = Path.home() / ".cache" / "huggingface"
+    # Embeddings written to ChromaDB per add call
+    write_batch_size: int = Field(default=128, ge=1, le=1000)
+    # Keep vectors in memory only, e.g. for tests; nothing is persisted
+    vector_db_in_memory: bool = False
 
     @field_validator("documents_path", "vector_db_path", "model_cache_path")
     @classmethod
@@ -29,6 +33,8 @@ class EmbeddingSettings(BaseSettings):
     model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
     batch_size: int = Field(default=32, ge=1, le=128)
     device: Literal["cpu", "cuda"] = "cpu"
+    # Seconds a cached query embedding stays valid (0 = until evicted)
+    query_cache_ttl: float = Field(default=0.0, ge=0.0)
 
 
 class ChunkingSettings(BaseSettings):
@@ -53,6 +59,7 @@ class ProcessingSettings(BaseSettings):
     max_concurrent_tasks: int = Field(default=3, ge=1, le=10)
     ocr_confidence_threshold: float = Field(default=0.6, ge=0.0, le=1.0)
     max_file_size_mb: int = Field(default=100, ge=1, le=1000)
+    extract_workers: int = Field(default=2, ge=1, le=32)
 
 
 class OCRSettings(BaseSettings):
@@ -61,6 +68,10 @@ class OCRSettings(BaseSettings):
     enabled: bool = True
     language: str = "eng"
     force_ocr: bool = False
+    # Resolution used to rasterize PDF pages for OCR
+    dpi: int = Field(default=200, ge=72, le=600)
+    # Binarize images with adaptive thresholding before OCR (helps noisy scans)
+    preprocess: bool = False
     # Accept all results per requirements (threshold not enforced)
     confidence_threshold: float = Field(default=0.0, ge=0.0, le=1.0)
 
@@ -109,9 +120,10 @@ class Settings(BaseSettings):
         return cls(**config_data)
 
     def ensure_directories(self) -> None:
-        """Ensure all required directories exist."""
-        self.storage.documents_path.mkdir(parents=True, exist_ok=True)
-        self.storage.vector_db_path.mkdir(parents=True, exist_ok=True)
+        """Ensure all required directories exist (storage is skipped when kept in memory)."""
+        if not self.storage.vector_db_in_memory:
+            self.storage.documents_path.mkdir(parents=True, exist_ok=True)
+            self.storage.vector_db_path.mkdir(parents=True, exist_ok=True)
         self.storage.model_cache_path.mkdir(parents=True, exist_ok=True)
 
 
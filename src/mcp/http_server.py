@@ -618,7 +618,11 @@ class HTTPStreamableServer:
             log_level="info",
         )
         server = uvicorn.Server(config)
-        await server.serve()
+        try:
+            await server.serve()
+        finally:
+            # Flushes the document snapshot and stops the extraction workers
+            self.knowledge_service.close()
 
 
 async def main():
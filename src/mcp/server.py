@@ -358,7 +358,15 @@ class KnowledgeMCPServer:
         }
 
     async def run(self) -> None:
-        """Run the MCP server."""
+        """Run the MCP server, closing the knowledge service on shutdown."""
+        try:
+            await self._serve()
+        finally:
+            # Flushes the document snapshot and stops the extraction workers
+            self.knowledge_service.close()
+
+    async def _serve(self) -> None:
+        """Serve MCP requests on the configured transport."""
         settings = get_settings()
         logger.info("Starting MCP Knowledge Server...")
 
@@ -1,11 +1,14 @@
 """
 Document models and enums for the knowledge server.
 """
+import os
 from datetime import datetime
 from enum import Enum
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 from uuid import uuid4
 
+import blake3
 from pydantic import BaseModel, Field, field_validator
 
 
@@ -69,6 +72,40 @@ class Document(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict)
     error_message: Optional[str] = None
     
+    @classmethod
+    def from_path(cls, path: Path, **kwargs: Any) -> "Document":
+        """
+        Create a document for a file, hashing its content.
+
+        The file is hashed with BLAKE3 straight from a memory map, on all
+        cores for large files, giving the same content hash the knowledge
+        service uses for deduplication.
+
+        Args:
+            path: Path to the document file
+            **kwargs: Additional Document fields (e.g. contexts, metadata)
+
+        Returns:
+            New Document with filename, path, format, size and hash filled in
+
+        Raises:
+            ValueError: If the file format is not supported or the file is empty
+        """
+        # Imported here because validation imports this module
+        from src.utils.validation import validate_file_format
+
+        document_format = validate_file_format(path)
+        hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+        hasher.update_mmap(path)
+        return cls(
+            filename=path.name,
+            file_path=str(path),
+            content_hash=hasher.hexdigest(),
+            format=document_format,
+            size_bytes=os.stat(path).st_size,
+            **kwargs,
+        )
+
     @field_validator("filename")
     @classmethod
     def validate_filename(cls, v: str) -> str:
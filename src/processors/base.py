@@ -12,6 +12,9 @@ from src.models.document import DocumentFormat, ProcessingMethod
 class BaseProcessor(ABC):
     """Base interface for document processors."""
 
+    # Whether process_bytes parses from memory instead of re-reading the file
+    supports_bytes: bool = False
+
     @property
     @abstractmethod
     def supported_format(self) -> DocumentFormat:
@@ -60,3 +63,21 @@ class BaseProcessor(ABC):
         text = await self.extract_text(file_path)
         metadata = await self.extract_metadata(file_path)
         return text, metadata, ProcessingMethod.TEXT_EXTRACTION
+
+    async def process_bytes(
+        self, data: bytes, file_path: Path
+    ) -> tuple[str, dict[str, Any], ProcessingMethod]:
+        """
+        Process a document whose content is already loaded in memory.
+
+        Processors that can parse from a buffer override this and set
+        ``supports_bytes``; the default reads ``file_path`` instead.
+
+        Args:
+            data: Raw file content
+            file_path: Path to the document file (used for names and fallbacks)
+
+        Returns:
+            Tuple of (text_content, metadata, processing_method)
+        """
+        return await self.process(file_path)
@@ -7,7 +7,7 @@ from typing import Any
 
 from bs4 import BeautifulSoup
 
-from src.models.document import DocumentFormat
+from src.models.document import DocumentFormat, ProcessingMethod
 from src.processors.base import BaseProcessor
 from src.utils.logging_config import get_logger
 
@@ -17,6 +17,8 @@ logger = get_logger(__name__)
 class HTMLProcessor(BaseProcessor):
     """HTML document processor."""
 
+    supports_bytes = True
+
     @property
     def supported_format(self) -> DocumentFormat:
         return DocumentFormat.HTML
@@ -28,12 +30,7 @@ class HTMLProcessor(BaseProcessor):
                 html_content = f.read()
 
             soup = BeautifulSoup(html_content, "lxml")
-
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-
-            text = soup.get_text(separator="\n", strip=True)
+            text = self._text_from_soup(soup)
             logger.info(f"Extracted {len(text)} characters from HTML: {file_path.name}")
             return text
         except Exception as e:
@@ -47,20 +44,53 @@ class HTMLProcessor(BaseProcessor):
                 html_content = f.read()
 
             soup = BeautifulSoup(html_content, "lxml")
-            metadata = {"format": "html"}
-
-            # Extract title
-            if soup.title:
-                metadata["title"] = soup.title.string
+            return self._metadata_from_soup(soup)
+        except Exception as e:
+            logger.warning(f"Failed to extract HTML metadata: {e}")
+            return {"format": "html"}
 
-            # Extract meta tags
-            for meta in soup.find_all("meta"):
-                if meta.get("name") == "author":
-                    metadata["author"] = meta.get("content")
-                elif meta.get("name") == "description":
-                    metadata["description"] = meta.get("content")
+    async def process_bytes(
+        self, data: bytes, file_path: Path
+    ) -> tuple[str, dict[str, Any], ProcessingMethod]:
+        """Process HTML from memory, parsing the markup only once."""
+        try:
+            soup = BeautifulSoup(data.decode("utf-8"), "lxml")
+        except Exception as e:
+            logger.error(f"Failed to extract text from HTML {file_path}: {e}")
+            raise
 
-            return metadata
+        try:
+            metadata = self._metadata_from_soup(soup)
         except Exception as e:
             logger.warning(f"Failed to extract HTML metadata: {e}")
-            return {"format": "html"}
+            metadata = {"format": "html"}
+
+        text = self._text_from_soup(soup)
+        logger.info(f"Extracted {len(text)} characters from HTML: {file_path.name}")
+        return text, metadata, ProcessingMethod.TEXT_EXTRACTION
+
+    @staticmethod
+    def _text_from_soup(soup: BeautifulSoup) -> str:
+        """Get visible text, dropping script and style elements."""
+        for script in soup(["script", "style"]):
+            script.decompose()
+        return soup.get_text(separator="\n", strip=True)
+
+    @staticmethod
+    def _metadata_from_soup(soup: BeautifulSoup) -> dict[str, Any]:
+        """Read title and author/description meta tags."""
+        metadata = {"format": "html"}
+
+        # Extract title
+        if soup.title and soup.title.string is not None:
+            # A plain str; a NavigableString references the whole parse tree
+            metadata["title"] = str(soup.title.string)
+
+        # Extract meta tags
+        for meta in soup.find_all("meta"):
+            if meta.get("name") == "author":
+                metadata["author"] = meta.get("content")
+            elif meta.get("name") == "description":
+                metadata["description"] = meta.get("content")
+
+        return metadata
@@ -2,8 +2,9 @@
 PDF document processor with smart OCR fallback.
 """
 
+import io
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, BinaryIO, Optional
 
 import pdfplumber
 import PyPDF2
@@ -19,6 +20,8 @@ logger = get_logger(__name__)
 class PDFProcessor(BaseProcessor):
     """PDF document processor with automatic OCR fallback."""
 
+    supports_bytes = True
+
     def __init__(self, ocr_service: Optional[OCRService] = None):
         """
         Initialize PDF processor.
@@ -34,9 +37,23 @@ class PDFProcessor(BaseProcessor):
 
     async def extract_text(self, file_path: Path) -> str:
         """Extract text from PDF using pdfplumber."""
+        return self._read_text(file_path, file_path)
+
+    async def extract_metadata(self, file_path: Path) -> dict[str, Any]:
+        """Extract metadata from PDF."""
+        try:
+            with open(file_path, "rb") as f:
+                return self._read_metadata(f)
+        except Exception as e:
+            logger.warning(f"Failed to extract PDF metadata: {e}")
+            return {"format": "pdf"}
+
+    @staticmethod
+    def _read_text(source: Path | BinaryIO, file_path: Path) -> str:
+        """Extract page text from a PDF path or binary stream."""
         try:
             text_parts = []
-            with pdfplumber.open(file_path) as pdf:
+            with pdfplumber.open(source) as pdf:
                 for page in pdf.pages:
                     page_text = page.extract_text()
                     if page_text:
@@ -49,30 +66,26 @@ class PDFProcessor(BaseProcessor):
             logger.error(f"Failed to extract text from PDF {file_path}: {e}")
             raise
 
-    async def extract_metadata(self, file_path: Path) -> dict[str, Any]:
-        """Extract metadata from PDF."""
-        try:
-            with open(file_path, "rb") as f:
-                pdf_reader = PyPDF2.PdfReader(f)
-                metadata = {
-                    "page_count": len(pdf_reader.pages),
-                    "format": "pdf",
-                }
-
-                # Add document info if available
-                if pdf_reader.metadata:
-                    info = pdf_reader.metadata
-                    if info.get("/Title"):
-                        metadata["title"] = str(info["/Title"])
-                    if info.get("/Author"):
-                        metadata["author"] = str(info["/Author"])
-                    if info.get("/Subject"):
-                        metadata["subject"] = str(info["/Subject"])
-
-                return metadata
-        except Exception as e:
-            logger.warning(f"Failed to extract PDF metadata: {e}")
-            return {"format": "pdf"}
+    @staticmethod
+    def _read_metadata(stream: BinaryIO) -> dict[str, Any]:
+        """Read page count and document info from a PDF stream."""
+        pdf_reader = PyPDF2.PdfReader(stream)
+        metadata = {
+            "page_count": len(pdf_reader.pages),
+            "format": "pdf",
+        }
+
+        # Add document info if available
+        if pdf_reader.metadata:
+            info = pdf_reader.metadata
+            if info.get("/Title"):
+                metadata["title"] = str(info["/Title"])
+            if info.get("/Author"):
+                metadata["author"] = str(info["/Author"])
+            if info.get("/Subject"):
+                metadata["subject"] = str(info["/Subject"])
+
+        return metadata
 
     async def process(self, file_path: Path) -> tuple[str, dict[str, Any], ProcessingMethod]:
         """
@@ -87,7 +100,33 @@ class PDFProcessor(BaseProcessor):
         # Extract text using standard method
         extracted_text = await self.extract_text(file_path)
         metadata = await self.extract_metadata(file_path)
+        return await self._with_ocr_fallback(extracted_text, metadata, file_path)
+
+    async def process_bytes(
+        self, data: bytes, file_path: Path
+    ) -> tuple[str, dict[str, Any], ProcessingMethod]:
+        """
+        Process a PDF already loaded in memory.
 
+        Text, metadata and the OCR fallback all read the buffer rather
+        than ``file_path``.
+        """
+        extracted_text = self._read_text(io.BytesIO(data), file_path)
+        try:
+            metadata = self._read_metadata(io.BytesIO(data))
+        except Exception as e:
+            logger.warning(f"Failed to extract PDF metadata: {e}")
+            metadata = {"format": "pdf"}
+        return await self._with_ocr_fallback(extracted_text, metadata, file_path, data)
+
+    async def _with_ocr_fallback(
+        self,
+        extracted_text: str,
+        metadata: dict[str, Any],
+        file_path: Path,
+        data: bytes | None = None,
+    ) -> tuple[str, dict[str, Any], ProcessingMethod]:
+        """Replace poor-quality extracted text with OCR output, rasterizing ``data`` if given."""
         # Check if OCR is needed and available
         if self.ocr_service:
             needs_ocr = await self.ocr_service.is_ocr_needed(extracted_text)
@@ -95,7 +134,9 @@ class PDFProcessor(BaseProcessor):
             if needs_ocr:
                 logger.info(f"Text quality insufficient - using OCR for {file_path.name}")
                 try:
-                    ocr_text, confidence = await self.ocr_service.process_pdf_with_ocr(file_path)
+                    ocr_text, confidence = await self.ocr_service.process_pdf_with_ocr(
+                        file_path, pdf_data=data
+                    )
                     
                     # Add OCR metadata
                     metadata["ocr_confidence"] = confidence
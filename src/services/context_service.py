@@ -1,6 +1,7 @@
 """
 Service for managing contexts (document collections).
 """
+from collections import Counter
 from datetime import datetime
 from typing import Any, Optional
 
@@ -28,6 +29,8 @@ class ContextService:
     def __init__(self):
         """Initialize context service with default context."""
         self._contexts: dict[str, Context] = {}
+        # Document count changes buffered by add_to_count until flush()
+        self._pending_counts: Counter[str] = Counter()
         # Always create default context
         self._contexts["default"] = Context(
             name="default",
@@ -186,3 +189,35 @@ class ContextService:
         if context.document_count > 0:
             context.document_count -= 1
         context.updated_at = datetime.utcnow()
+
+    def add_to_count(self, name: str, delta: int) -> None:
+        """
+        Buffer a document count change for a context until flush().
+
+        Args:
+            name: Context name
+            delta: Change in document count (negative to decrement)
+        """
+        self._pending_counts[name] += delta
+
+    def flush(self) -> None:
+        """
+        Apply all buffered document count changes at once.
+
+        Counts never drop below zero. Changes for contexts that no longer
+        exist, e.g. one deleted while a document was being ingested into it,
+        are logged and discarded.
+        """
+        pending, self._pending_counts = self._pending_counts, Counter()
+        now = datetime.utcnow()
+        missing = []
+        for name, delta in pending.items():
+            context = self._contexts.get(name)
+            if context is None:
+                missing.append(name)
+                continue
+            context.document_count = max(0, context.document_count + delta)
+            context.updated_at = now
+
+        if missing:
+            logger.warning(f"Discarded document counts for missing context(s): {', '.join(missing)}")
@@ -4,6 +4,7 @@ Embedding service with model loading and caching.
 
 from pathlib import Path
 
+import numpy as np
 import torch
 from sentence_transformers import SentenceTransformer
 
@@ -65,25 +66,43 @@ class EmbeddingService:
         Returns:
             List of embedding vectors
         """
-        model = self._load_model()
-
-        embeddings = model.encode(
-            texts,
-            batch_size=batch_size,
-            show_progress_bar=show_progress,
-            convert_to_tensor=False,
-            normalize_embeddings=True,  # For cosine similarity
-        )
-
         # Convert to list of lists
-        if isinstance(embeddings, torch.Tensor):
-            embeddings = embeddings.cpu().tolist()
-        else:
-            embeddings = embeddings.tolist()
+        embeddings = (await self.encode_array(texts, batch_size, show_progress)).tolist()
 
-        logger.debug(f"Generated {len(embeddings)} embeddings")
+        logger.debug("Generated %d embeddings", len(embeddings))
         return embeddings
 
+    async def encode_array(
+        self,
+        texts: list[str],
+        batch_size: int = 32,
+        show_progress: bool = False,
+    ) -> np.ndarray:
+        """
+        Generate embeddings for a list of texts as a float32 array.
+
+        Args:
+            texts: List of text strings to embed
+            batch_size: Batch size for encoding
+            show_progress: Whether to show progress bar
+
+        Returns:
+            Contiguous float32 array of shape (len(texts), dimension)
+        """
+        model = self._load_model()
+
+        # No autograd bookkeeping is needed for inference
+        with torch.inference_mode():
+            embeddings = model.encode(
+                texts,
+                batch_size=batch_size,
+                show_progress_bar=show_progress,
+                convert_to_numpy=True,
+                normalize_embeddings=True,  # Inner product then equals cosine similarity
+            )
+
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
     async def encode_single(self, text: str) -> list[float]:
         """
         Generate embedding for a single text.
@@ -0,0 +1,105 @@
+"""
+Persistent cache of file content hashes keyed by path, mtime and size.
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class HashCache:
+    """SQLite-backed cache mapping (path, mtime_ns, size) to a content hash."""
+
+    def __init__(self, db_path: Path | None):
+        """
+        Initialize hash cache.
+
+        Args:
+            db_path: Path to the SQLite database file (None = in memory only)
+        """
+        self.db_path = db_path
+        if db_path is not None:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Accessed from worker threads via asyncio.to_thread
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(db_path) if db_path is not None else ":memory:", check_same_thread=False
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS file_hashes ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, hash TEXT)"
+        )
+        self._conn.commit()
+
+        location = "in memory" if db_path is None else f"at {db_path}"
+        logger.info(f"Hash cache initialized {location}")
+
+    def get(self, file_path: Path, stat_result: os.stat_result) -> str | None:
+        """
+        Get the cached hash for a file if it is unchanged.
+
+        Args:
+            file_path: Path to the file
+            stat_result: Current stat of the file
+
+        Returns:
+            Cached content hash, or None if missing or stale
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hash FROM file_hashes WHERE path = ? AND mtime_ns = ? AND size = ?",
+                (str(file_path.resolve()), stat_result.st_mtime_ns, stat_result.st_size),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, file_path: Path, stat_result: os.stat_result, content_hash: str) -> None:
+        """
+        Record the hash of a file.
+
+        Args:
+            file_path: Path to the file
+            stat_result: Stat of the file when it was hashed
+            content_hash: Content hash to cache
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_hashes (path, mtime_ns, size, hash) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    str(file_path.resolve()),
+                    stat_result.st_mtime_ns,
+                    stat_result.st_size,
+                    content_hash,
+                ),
+            )
+            self._conn.commit()
+
+    def delete(self, file_path: Path) -> None:
+        """
+        Drop the cached hash for a file.
+
+        Args:
+            file_path: Path to the file
+        """
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM file_hashes WHERE path = ?", (str(file_path.resolve()),)
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Drop every cached hash."""
+        with self._lock:
+            self._conn.execute("DELETE FROM file_hashes")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,311 @@
+"""
+Staged ingestion pipeline for adding many documents at once.
+"""
+
+import asyncio
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, cast
+from uuid import uuid4
+
+import numpy as np
+
+from src.models.document import Document
+from src.utils.logging_config import get_logger
+
+if TYPE_CHECKING:
+    from src.services.knowledge_service import KnowledgeService
+
+logger = get_logger(__name__)
+
+# Items each queue holds before the stage feeding it waits (in documents
+# between load and chunk, in embedding batches after that)
+_QUEUE_SIZE = 4
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class _PendingDocument:
+    """Progress of one document through the embed and upsert stages."""
+
+    __slots__ = ("document", "index", "metadata", "run_ids", "chunk_count", "remaining", "failed")
+
+    def __init__(self, document: Document, index: int, metadata: dict[str, Any], chunk_count: int):
+        self.document = document
+        self.index = index
+        self.metadata = metadata
+        # Embedding IDs follow KnowledgeService: "<context>_<run hex>_<chunk index>"
+        self.run_ids = {context: uuid4().hex for context in document.contexts}
+        self.chunk_count = chunk_count
+        # Chunk rows (chunks x contexts) still to be written
+        self.remaining = chunk_count * len(document.contexts)
+        self.failed = False
+
+
+class IngestPipeline:
+    """
+    Four-stage ingestion pipeline: load -> chunk -> embed -> upsert.
+
+    Stages run concurrently and are connected by bounded queues, so a slow
+    stage holds back the stages feeding it. Several load workers validate,
+    hash and extract files while earlier files are chunked, embedded and
+    written. The embed stage batches chunks across documents by
+    ``embedding.batch_size``, and the upsert stage groups rows per context by
+    ``storage.write_batch_size``, independently of the embedding batches.
+    """
+
+    def __init__(
+        self,
+        service: "KnowledgeService",
+        metadata: dict[str, Any] | None = None,
+        force_ocr: bool = False,
+        contexts: list[str] | None = None,
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            service: Knowledge service whose documents and stores are used
+            metadata: Optional metadata dictionary applied to every document
+            force_ocr: Force OCR even if text extraction is available
+            contexts: List of context names to add documents to (default: ["default"])
+        """
+        self.service = service
+        self.metadata = metadata
+        self.force_ocr = force_ocr
+        self.contexts = contexts
+        # Filled in by the stages; every path has a result once they finish
+        self._results: list[str | BaseException | None] = []
+        # Admitted documents not yet completed or failed: id -> (index, document)
+        self._in_flight: dict[str, tuple[int, Document]] = {}
+
+    async def run(self, file_paths: list[Path]) -> list[str | BaseException]:
+        """
+        Ingest files and wait until every document is stored.
+
+        Args:
+            file_paths: Paths to the document files
+
+        Returns:
+            Document ID or the raised exception for each path, in input order
+        """
+        settings = self.service.settings
+        load_workers = min(settings.processing.max_concurrent_tasks, len(file_paths)) or 1
+        self._results = [None] * len(file_paths)
+
+        paths: asyncio.Queue = asyncio.Queue()
+        for item in enumerate(file_paths):
+            paths.put_nowait(item)
+        for _ in range(load_workers):
+            paths.put_nowait(_DONE)
+
+        texts: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_SIZE)
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_SIZE * settings.embedding.batch_size)
+        batches: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_SIZE)
+
+        async def load_all() -> None:
+            await asyncio.gather(*[self._load(paths, texts) for _ in range(load_workers)])
+            await texts.put(_DONE)
+
+        # A stage that fails outright cancels the others instead of leaving them blocked
+        try:
+            async with asyncio.TaskGroup() as stages:
+                stages.create_task(load_all())
+                stages.create_task(self._chunk(texts, chunks))
+                stages.create_task(self._embed(chunks, batches))
+                stages.create_task(self._upsert(batches))
+        except BaseException as e:
+            # Documents still in the pipeline would otherwise stay PROCESSING
+            for index, document in list(self._in_flight.values()):
+                await self._fail_document(index, document, e)
+            raise
+
+        failed = sum(isinstance(result, BaseException) for result in self._results)
+        logger.info(f"Ingested {len(file_paths) - failed} of {len(file_paths)} files")
+        return cast(list[str | BaseException], self._results)
+
+    def _mark_failed(self, pending: _PendingDocument, error: BaseException) -> bool:
+        """
+        Stop writing a chunked document's rows and report the error for its path.
+
+        Returns:
+            True the first time the document fails; the caller then fails it
+            in the service, from the upsert stage so no write of it is in flight
+        """
+        if pending.failed:
+            return False
+        pending.failed = True
+        self._results[pending.index] = error
+        return True
+
+    async def _fail_document(self, index: int, document: Document, error: BaseException) -> None:
+        """Mark an admitted document failed, deleting stored chunks, and report the error."""
+        self._in_flight.pop(document.id, None)
+        self._results[index] = error
+        await self.service.fail_document(document, error)
+
+    async def _complete_document(self, document: Document, chunk_count: int) -> None:
+        """Mark an admitted document completed with its stored chunk count."""
+        await self.service.complete_document(document, chunk_count)
+        self._in_flight.pop(document.id, None)
+
+    async def _load(self, paths: asyncio.Queue, texts: asyncio.Queue) -> None:
+        """Stage 1: validate, hash and register files, then extract their text."""
+        while (item := paths.get_nowait()) is not _DONE:
+            index, file_path = item
+            try:
+                document_id, document = await self.service.admit_document(
+                    file_path,
+                    metadata=dict(self.metadata) if self.metadata else None,
+                    contexts=self.contexts,
+                )
+            except Exception as e:
+                self._results[index] = e
+                continue
+
+            self._results[index] = document_id
+            if document is None:
+                # Duplicate of an existing document
+                continue
+            self._in_flight[document.id] = (index, document)
+
+            try:
+                text = await self.service.extract_text(document, self.force_ocr)
+            except Exception as e:
+                await self._fail_document(index, document, e)
+                continue
+            if text is None:
+                # Too little text to index; already marked completed
+                self._in_flight.pop(document.id, None)
+                continue
+            await texts.put((index, document, text))
+
+    async def _chunk(self, texts: asyncio.Queue, chunks: asyncio.Queue) -> None:
+        """Stage 2: split extracted text into chunks."""
+        while (item := await texts.get()) is not _DONE:
+            index, document, text = item
+            try:
+                # Consumed in a thread so chunking doesn't stall the embed and upsert stages
+                document_chunks = await asyncio.to_thread(
+                    list, await self.service.split_text(text)
+                )
+            except Exception as e:
+                await self._fail_document(index, document, e)
+                continue
+
+            if not document_chunks:
+                await self._complete_document(document, 0)
+                continue
+
+            pending = _PendingDocument(
+                document,
+                index,
+                self.service.chunk_metadata(document),
+                len(document_chunks),
+            )
+            for chunk_index, chunk in enumerate(document_chunks):
+                await chunks.put((pending, chunk_index, chunk))
+        await chunks.put(_DONE)
+
+    async def _embed(self, chunks: asyncio.Queue, batches: asyncio.Queue) -> None:
+        """Stage 3: embed chunks in batches that may span documents."""
+        batch_size = self.service.settings.embedding.batch_size
+        done = False
+        while not done:
+            # Wait for one chunk, then take whatever else is ready up to a full batch
+            batch = []
+            item = await chunks.get()
+            while item is not _DONE:
+                if not item[0].failed:
+                    batch.append(item)
+                if len(batch) >= batch_size or chunks.empty():
+                    break
+                item = chunks.get_nowait()
+            done = item is _DONE
+            if not batch:
+                continue
+
+            try:
+                embeddings = await self.service.embedding_service.encode_array(
+                    [chunk for _, _, chunk in batch], batch_size=batch_size
+                )
+                if len(embeddings) != len(batch):
+                    raise RuntimeError(
+                        f"Embedding count ({len(embeddings)}) does not match "
+                        f"chunk count ({len(batch)})"
+                    )
+            except Exception as e:
+                # Failed by the upsert stage, after any write of theirs in progress
+                failed = [pending for pending, _, _ in batch if self._mark_failed(pending, e)]
+                await batches.put((failed, e))
+                continue
+            await batches.put((batch, embeddings))
+        await batches.put(_DONE)
+
+    async def _upsert(self, batches: asyncio.Queue) -> None:
+        """Stage 4: write embedded chunks to every context of their document."""
+        write_batch_size = self.service.settings.storage.write_batch_size
+        # Rows buffered per context: (pending document, chunk index, chunk, embedding)
+        buffers: dict[str, list[tuple[_PendingDocument, int, str, np.ndarray]]] = {}
+
+        done = False
+        while not done:
+            item = await batches.get()
+            done = item is _DONE
+            if not done and isinstance(item[1], BaseException):
+                # Documents whose embedding failed
+                failed, error = item
+                for pending in failed:
+                    await self._fail_document(pending.index, pending.document, error)
+            elif not done:
+                batch, embeddings = item
+                for (pending, chunk_index, chunk), embedding in zip(
+                    batch, embeddings, strict=True
+                ):
+                    for context in pending.document.contexts:
+                        buffers.setdefault(context, []).append(
+                            (pending, chunk_index, chunk, embedding)
+                        )
+
+            # Write full batches, and the remainder once all input has arrived
+            for context, rows in buffers.items():
+                while rows and (done or len(rows) >= write_batch_size):
+                    await self._write(context, rows[:write_batch_size])
+                    del rows[:write_batch_size]
+
+    async def _write(
+        self,
+        context: str,
+        rows: list[tuple[_PendingDocument, int, str, np.ndarray]],
+    ) -> None:
+        """Write rows to one context and complete documents whose rows are all stored."""
+        rows = [row for row in rows if not row[0].failed]
+        if not rows:
+            return
+
+        try:
+            await self.service.begin_vector_write()
+            await self.service.vector_store.add_embeddings(
+                collection_name="knowledge_base_documents",  # Legacy parameter
+                ids=[
+                    f"{context}_{pending.run_ids[context]}_{chunk_index}"
+                    for pending, chunk_index, _, _ in rows
+                ],
+                embeddings=np.stack([embedding for _, _, _, embedding in rows]),
+                documents=[chunk for _, _, chunk, _ in rows],
+                metadatas=[
+                    {**pending.metadata, "chunk_index": chunk_index, "context": context}
+                    for pending, chunk_index, _, _ in rows
+                ],
+                context=context,
+            )
+        except Exception as e:
+            for pending, _, _, _ in rows:
+                if self._mark_failed(pending, e):
+                    await self._fail_document(pending.index, pending.document, e)
+            return
+
+        for pending, _, _, _ in rows:
+            pending.remaining -= 1
+            if pending.remaining == 0 and not pending.failed:
+                await self._complete_document(pending.document, pending.chunk_count)
@@ -3,32 +3,158 @@ Core knowledge service for document management.
 """
 
 import asyncio
+import contextlib
 import hashlib
+import mmap
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, OrderedDict, defaultdict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
 from typing import Any, Optional
 from uuid import uuid4
 
+import blake3
+import numpy as np
+from pydantic import BaseModel
+
 from src.config.settings import get_settings
 from src.models.document import (
     Document,
     DocumentFormat,
+    ProcessingMethod,
     ProcessingStatus,
     ProcessingTask,
     TaskStatus,
 )
 from src.services.context_service import ContextService
 from src.services.embedding_service import EmbeddingService
+from src.services.hash_cache import HashCache
+from src.services.ingest_pipeline import IngestPipeline
 from src.services.text_extractor import TextExtractor
 from src.services.vector_store import VectorStore
-from src.utils.chunking import chunk_text
+from src.utils.chunking import chunk_text, make_chunker, split_into_sections
 from src.utils.logging_config import get_logger
-from src.utils.validation import validate_file_exists, validate_file_format, validate_file_size
+from src.utils.validation import sanitize_filename, validate_content, validate_file
 
 logger = get_logger(__name__)
 
+# Content hash recorded in chunk metadata; older stores used SHA-256
+_HASH_ALGORITHM = "blake3"
+
+# Maximum number of query embeddings kept by KnowledgeService.search
+_QUERY_CACHE_SIZE = 1024
+
+# Texts longer than this (in characters) are chunked in parallel sections
+_PARALLEL_CHUNK_THRESHOLD = 4 * 1024 * 1024
+
+# Vector store batch writes allowed in flight while the next batch is encoded
+_MAX_PENDING_WRITES = 4
+
+# Snapshot of processed documents, loaded at startup instead of scanning
+# every chunk's metadata in the vector store
+_SNAPSHOT_FILENAME = "documents.json"
+_SNAPSHOT_VERSION = 2
+
+# Seconds to coalesce document changes before writing the snapshot
+_SNAPSHOT_DELAY = 2.0
+
+# Extraction workers start from a fresh interpreter: forking a process that
+# already runs torch, ChromaDB and OCR threads can deadlock in the child
+_WORKER_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Per-worker-process extractors, keyed by their OCR options
+_worker_extractors: dict[tuple[bool, str, int, bool, int], TextExtractor] = {}
+
+
+def _extract_sync(
+    file_path: str,
+    document_format: DocumentFormat,
+    force_ocr: bool,
+    ocr_language: str,
+    ocr_dpi: int,
+    ocr_preprocess: bool,
+    ocr_threads: int,
+    content: bytes | None = None,
+) -> tuple[str, dict[str, Any], ProcessingMethod]:
+    """
+    Extract text from a document inside an extraction worker process.
+
+    Module-level so it can be pickled by ProcessPoolExecutor. Metadata is
+    reduced to plain Python values before it is returned, since processors may
+    hand back library objects (e.g. bs4 strings) that are costly or impossible
+    to pickle. Files are read here, in the worker; ``content`` is only given
+    for documents added from memory, which have no file. ``ocr_threads`` is
+    this worker's share of the CPU cores, so workers OCRing at the same time
+    don't oversubscribe them.
+    """
+    key = (force_ocr, ocr_language, ocr_dpi, ocr_preprocess, ocr_threads)
+    extractor = _worker_extractors.get(key)
+    if extractor is None:
+        extractor = TextExtractor(
+            force_ocr=force_ocr,
+            ocr_language=ocr_language,
+            ocr_dpi=ocr_dpi,
+            ocr_preprocess=ocr_preprocess,
+            ocr_threads=ocr_threads,
+        )
+        _worker_extractors[key] = extractor
+    if content is not None:
+        result = extractor.extract_bytes(content, document_format, Path(file_path))
+    else:
+        result = extractor.extract(Path(file_path), document_format)
+    text, metadata, processing_method = asyncio.run(result)
+    return str(text), _plain_value(metadata), processing_method
+
+
+def _plain_value(value: Any) -> Any:
+    """Convert a metadata value to built-in types that pickle and serialize cheaply."""
+    if value is None or type(value) in (str, int, float, bool):
+        return value
+    if isinstance(value, np.generic):
+        # NumPy scalars, e.g. an OCR confidence
+        return value.item()
+    if isinstance(value, dict):
+        return {str(key): _plain_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_plain_value(item) for item in value]
+    # str subclasses such as bs4's NavigableString, and anything else
+    return str(value)
+
+
+class _Snapshot(BaseModel):
+    """Contents of the document snapshot file."""
+
+    version: int
+    # Vector store write generation the snapshot was taken at
+    generation: int = 0
+    has_legacy_hashes: bool = False
+    documents: list[Document] = []
+
+
+def _batched(items: Iterable[str], size: int) -> Iterator[list[str]]:
+    """Yield successive lists of up to ``size`` items."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
 
 class KnowledgeService:
-    """Core service for knowledge base operations with multi-context support."""
+    """
+    Core service for knowledge base operations with multi-context support.
+
+    Ingestion runs as a sequence of steps: admit_document, extract_text,
+    split_text, then embedding and writing chunks (each write preceded by
+    begin_vector_write, with chunk_metadata on every chunk), and finally
+    complete_document or fail_document. add_document runs them for one file;
+    IngestPipeline runs them concurrently for add_documents.
+    """
 
     def __init__(self):
         self.settings = get_settings()
@@ -36,69 +162,330 @@ class KnowledgeService:
         self.text_extractor = TextExtractor(
             force_ocr=self.settings.ocr.force_ocr,
             ocr_language=self.settings.ocr.language,
+            ocr_dpi=self.settings.ocr.dpi,
+            ocr_preprocess=self.settings.ocr.preprocess,
         )
         self.embedding_service = EmbeddingService(
             model_name=self.settings.embedding.model_name,
             device=self.settings.embedding.device,
             cache_folder=self.settings.storage.model_cache_path,
         )
-        self.vector_store = VectorStore(self.settings.storage.vector_db_path)
+        self.vector_store = VectorStore(
+            self.settings.storage.vector_db_path,
+            write_batch_size=self.settings.storage.write_batch_size,
+            in_memory=self.settings.storage.vector_db_in_memory,
+        )
+        # An in-memory store keeps its hash cache in memory too
+        self.hash_cache = HashCache(
+            None
+            if self.settings.storage.vector_db_in_memory
+            else self.settings.storage.vector_db_path / "hash_cache.db"
+        )
+        # CPU-heavy parsing (PDF, OCR) runs in worker processes to bypass the GIL
+        self._extract_pool = ProcessPoolExecutor(
+            max_workers=self.settings.processing.extract_workers,
+            mp_context=multiprocessing.get_context(_WORKER_START_METHOD),
+        )
+        # Each worker's OCR and PDF rendering threads, splitting the cores between workers
+        self._ocr_threads = max(
+            1, (os.cpu_count() or 1) // self.settings.processing.extract_workers
+        )
         self._tasks: dict[str, ProcessingTask] = {}
         self._documents: dict[str, Document] = {}
+        # content_hash -> document_id, for constant-time duplicate detection
+        self._hash_index: dict[str, str] = {}
+        # Aggregates maintained on add/remove so listing and statistics
+        # don't scan every document; context -> insertion-ordered IDs
+        self._by_context: defaultdict[str, dict[str, None]] = defaultdict(dict)
+        self._status_counts: Counter[ProcessingStatus] = Counter()
+        self._format_counts: Counter[DocumentFormat] = Counter()
+        self._total_chunks = 0
+        self._total_bytes = 0
+        # Set when loaded documents were hashed with SHA-256 rather than BLAKE3
+        self._has_legacy_hashes = False
+        # (embedding, time cached) keyed on a SHA-256 of the exact query text,
+        # with LRU eviction and an optional TTL
+        self._query_cache: OrderedDict[str, tuple[list[float], float]] = OrderedDict()
+        # Queries being encoded, so concurrent misses wait instead of encoding again
+        self._pending_queries: dict[str, asyncio.Future[list[float]]] = {}
+        # An in-memory store starts empty, so there is nothing to snapshot
+        self._snapshot_path: Path | None = (
+            None
+            if self.settings.storage.vector_db_in_memory
+            else self.settings.storage.vector_db_path / _SNAPSHOT_FILENAME
+        )
+        self._snapshot_task: asyncio.Task | None = None
+        # Write generation recorded in the vector store; advanced before the
+        # first change after each snapshot so a snapshot that missed it is never loaded
+        self._generation = 0
+        self._snapshot_dirty = False
+        self._generation_lock = asyncio.Lock()
         self._load_existing_documents()
 
     def _load_existing_documents(self):
-        """Load existing documents from vector store on initialization."""
+        """Load existing documents from the snapshot, or from the vector store if it is stale."""
+        if self._load_snapshot():
+            return
+
         try:
-            # Get all unique document IDs from vector store
-            all_data = self.vector_store.get_all_documents()
-            
-            # Group by document_id to reconstruct Document objects
+            # Group chunk metadata by document_id and count chunks, one page at a time
             doc_map = {}
-            for metadata in all_data.get("metadatas", []):
-                doc_id = metadata.get("document_id")
-                if not doc_id or doc_id in doc_map:
-                    continue
-                    
-                doc_map[doc_id] = metadata
-            
+            chunk_counts: Counter[str] = Counter()
+            for page in self.vector_store.iter_all_documents(include=["metadatas"]):
+                for metadata in page.get("metadatas") or []:
+                    doc_id = metadata.get("document_id")
+                    if not doc_id:
+                        continue
+
+                    chunk_counts[doc_id] += 1
+                    if doc_id not in doc_map:
+                        doc_map[doc_id] = metadata
+                        if metadata.get("hash_algorithm") != _HASH_ALGORITHM:
+                            self._has_legacy_hashes = True
+
             # Recreate Document objects
             for doc_id, metadata in doc_map.items():
-                # Count chunks for this document
-                chunk_count = sum(1 for m in all_data.get("metadatas", []) if m.get("document_id") == doc_id)
-                
-                # Get size_bytes, use 1 as default to pass validation (actual size unknown for old data)
-                size_bytes = metadata.get("size_bytes")
-                if not size_bytes or size_bytes == 0:
-                    size_bytes = 1  # Placeholder for legacy data
-                
-                # Reconstruct document
-                doc = Document(
-                    id=doc_id,
-                    filename=metadata.get("filename", "unknown"),
-                    file_path=metadata.get("file_path", ""),
-                    content_hash=metadata.get("content_hash", ""),
-                    format=DocumentFormat(metadata.get("format", "pdf")),
-                    size_bytes=size_bytes,
-                    metadata={},
-                    processing_status=ProcessingStatus.COMPLETED,
-                    chunk_count=chunk_count,
+                self._register_document(
+                    self._document_from_chunk_metadata(doc_id, metadata, chunk_counts[doc_id])
                 )
-                self._documents[doc_id] = doc
-                
+
             if self._documents:
                 logger.info(f"Loaded {len(self._documents)} existing documents from vector store")
+            self._write_snapshot(self._snapshot_bytes())
         except Exception as e:
             logger.warning(f"Could not load existing documents: {e}")
 
-    def _calculate_file_hash(self, file_path: Path) -> str:
-        """Calculate SHA-256 hash of file content."""
+    @staticmethod
+    def _document_from_chunk_metadata(
+        doc_id: str,
+        metadata: dict[str, Any],
+        chunk_count: int,
+        contexts: list[str] | None = None,
+    ) -> Document:
+        """Rebuild a completed document from the metadata stored with its chunks."""
+        # Get size_bytes, use 1 as default to pass validation (actual size unknown for old data)
+        size_bytes = metadata.get("size_bytes")
+        if not size_bytes or size_bytes == 0:
+            size_bytes = 1  # Placeholder for legacy data
+
+        fields: dict[str, Any] = {"contexts": contexts} if contexts else {}
+        return Document(
+            id=doc_id,
+            filename=metadata.get("filename", "unknown"),
+            file_path=metadata.get("file_path", ""),
+            content_hash=metadata.get("content_hash", ""),
+            format=DocumentFormat(metadata.get("format", "pdf")),
+            size_bytes=size_bytes,
+            metadata={},
+            processing_status=ProcessingStatus.COMPLETED,
+            chunk_count=chunk_count,
+            **fields,
+        )
+
+    def _load_snapshot(self) -> bool:
+        """
+        Load documents from the snapshot file.
+
+        The snapshot is only used when its write generation matches the one
+        recorded in the vector store, so changes it missed fall back to a scan.
+
+        Returns:
+            True if documents were loaded from the snapshot
+        """
+        if self._snapshot_path is None:
+            return False
+        try:
+            self._generation = self.vector_store.get_generation()
+            # Parsed and validated in a single pass by pydantic's JSON parser
+            snapshot = _Snapshot.model_validate_json(self._snapshot_path.read_bytes())
+            if snapshot.version != _SNAPSHOT_VERSION:
+                return False
+            if snapshot.generation != self._generation:
+                logger.info("Document snapshot is out of date - rebuilding from vector store")
+                return False
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Could not load document snapshot: {e}")
+            return False
+
+        for document in snapshot.documents:
+            self._register_document(document)
+        self._has_legacy_hashes = snapshot.has_legacy_hashes
+
+        if self._documents:
+            logger.info(f"Loaded {len(self._documents)} existing documents from snapshot")
+        return True
+
+    def _snapshot_bytes(self) -> bytes:
+        """Serialize processed documents for the snapshot file."""
+        # Changes after this point advance the generation again
+        self._snapshot_dirty = False
+        documents = [
+            doc
+            for doc in self._documents.values()
+            if doc.processing_status == ProcessingStatus.COMPLETED and doc.chunk_count
+        ]
+        # Documents are already valid; model_construct skips validating them again
+        snapshot = _Snapshot.model_construct(
+            version=_SNAPSHOT_VERSION,
+            generation=self._generation,
+            has_legacy_hashes=self._has_legacy_hashes,
+            documents=documents,
+        )
+        return snapshot.model_dump_json().encode()
+
+    def _write_snapshot(self, data: bytes) -> None:
+        """Atomically replace the snapshot file with ``data``."""
+        if self._snapshot_path is None:
+            return
+        try:
+            temp_path = self._snapshot_path.with_suffix(".tmp")
+            temp_path.write_bytes(data)
+            os.replace(temp_path, self._snapshot_path)
+        except Exception as e:
+            logger.warning(f"Could not write document snapshot: {e}")
+
+    async def begin_vector_write(self) -> None:
+        """
+        Prepare for a change to the stored vectors.
+
+        Must be awaited before writing or deleting chunks in the vector store
+        directly, so a snapshot taken before the change is never loaded.
+        """
+        await self._invalidate_snapshot()
+
+    async def _invalidate_snapshot(self) -> None:
+        """
+        Make the snapshot on disk stale before a change to the stored vectors or documents.
+
+        Only the first change after each snapshot advances the generation, so
+        status updates and later batch writes cost nothing here.
+        """
+        if self._snapshot_path is None or self._snapshot_dirty:
+            return
+        # Concurrent callers wait until the new generation is recorded
+        async with self._generation_lock:
+            if not self._snapshot_dirty:
+                await asyncio.to_thread(self._advance_generation)
+
+    def _advance_generation(self) -> None:
+        """Record the next write generation in the vector store."""
+        if self._snapshot_path is None or self._snapshot_dirty:
+            return
+        # Published once recorded; a snapshot taken meanwhile keeps the old one
+        generation = self._generation + 1
+        try:
+            self.vector_store.set_generation(generation)
+        except Exception as e:
+            # Snapshots keep the generation the store last accepted; the one on
+            # disk may miss the coming change, so it goes
+            logger.warning(f"Could not record write generation, discarding snapshot: {e}")
+            with contextlib.suppress(OSError):
+                self._snapshot_path.unlink(missing_ok=True)
+            return
+        self._generation = generation
+        self._snapshot_dirty = True
+
+    def _schedule_snapshot(self) -> None:
+        """Write the snapshot shortly, coalescing changes made in the meantime."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_snapshot(self._snapshot_bytes())
+            return
+        if self._snapshot_task is None or self._snapshot_task.done():
+            self._snapshot_task = asyncio.create_task(self._save_snapshot_later())
+
+    async def _save_snapshot_later(self) -> None:
+        """Write the snapshot after the coalescing delay."""
+        await asyncio.sleep(_SNAPSHOT_DELAY)
+        # Changes made while writing schedule another snapshot
+        self._snapshot_task = None
+        await asyncio.to_thread(self._write_snapshot, self._snapshot_bytes())
+
+    def _register_document(self, document: Document) -> None:
+        """Add a document to the document table, hash index and aggregates."""
+        self._documents[document.id] = document
+        if document.content_hash:
+            self._hash_index[document.content_hash] = document.id
+        for context in document.contexts:
+            self._by_context[context][document.id] = None
+        self._status_counts[document.processing_status] += 1
+        self._format_counts[document.format] += 1
+        self._total_chunks += document.chunk_count
+        self._total_bytes += document.size_bytes
+
+    def _unregister_document(self, document: Document) -> None:
+        """Remove a document from the document table, hash index and aggregates."""
+        del self._documents[document.id]
+        # A retry of a failed document may own the hash by now
+        if self._hash_index.get(document.content_hash) == document.id:
+            del self._hash_index[document.content_hash]
+        for context in document.contexts:
+            ids = self._by_context[context]
+            ids.pop(document.id, None)
+            if not ids:
+                del self._by_context[context]
+        self._status_counts[document.processing_status] -= 1
+        self._format_counts[document.format] -= 1
+        self._total_chunks -= document.chunk_count
+        self._total_bytes -= document.size_bytes
+        self._schedule_snapshot()
+
+    def _set_status(self, document: Document, status: ProcessingStatus) -> None:
+        """Update a document's processing status and the status counts."""
+        # Documents removed while still processing no longer count
+        if self._documents.get(document.id) is not document:
+            document.processing_status = status
+            return
+        self._status_counts[document.processing_status] -= 1
+        self._status_counts[status] += 1
+        document.processing_status = status
+
+    def _find_duplicate(self, content_hashes: Iterable[str]) -> str | None:
+        """Return the ID of a known document with any of the given content hashes."""
+        for content_hash in content_hashes:
+            existing_id = self._hash_index.get(content_hash)
+            if existing_id is not None:
+                return existing_id
+        return None
+
+    def _calculate_file_hash(self, file_path: Path | None, content: bytes | None = None) -> str:
+        """Calculate BLAKE3 hash of file content, reading the file unless content is given."""
+        hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+        if content is not None:
+            hasher.update(content)
+        else:
+            self._hash_file_into(hasher, file_path)
+        return hasher.hexdigest()
+
+    def _calculate_legacy_file_hash(
+        self, file_path: Path | None, content: bytes | None = None
+    ) -> str:
+        """Calculate the SHA-256 hash used by documents ingested before BLAKE3."""
+        if content is not None:
+            return hashlib.sha256(content).hexdigest()
         sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(8192), b""):
-                sha256.update(chunk)
+        self._hash_file_into(sha256, file_path)
         return sha256.hexdigest()
 
+    @staticmethod
+    def _hash_file_into(hasher: Any, file_path: Path) -> None:
+        """Feed a whole file to a hasher in one update over a read-only memory map."""
+        with open(file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                # Empty files cannot be mapped
+                return
+            if size > sys.maxsize:
+                # Too large to map into a 32-bit address space
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    hasher.update(chunk)
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                hasher.update(mm)
+
     async def add_document(
         self,
         file_path: Path,
@@ -120,42 +507,81 @@ class KnowledgeService:
         Returns:
             Task ID if async, document ID if sync
         """
-        # Default to ["default"] if no contexts specified
-        if not contexts:
-            contexts = ["default"]
-        
-        # Validate all contexts exist
-        for ctx in contexts:
-            if not self.context_service.context_exists(ctx):
-                raise ValueError(f"Context '{ctx}' does not exist")
-        
-        # Validation
-        validate_file_exists(file_path)
-        document_format = validate_file_format(file_path)
-        validate_file_size(file_path, self.settings.processing.max_file_size_mb)
+        document_id, document = await self.admit_document(file_path, metadata, contexts)
+        if document is None:
+            return document_id
+        # The extraction worker reads the file itself
+        return await self._start_processing(document, None, async_processing, force_ocr)
 
-        # Calculate hash for deduplication
-        content_hash = self._calculate_file_hash(file_path)
+    async def add_document_bytes(
+        self,
+        data: bytes,
+        filename: str,
+        metadata: dict[str, Any] | None = None,
+        async_processing: bool = True,
+        force_ocr: bool = False,
+        contexts: list[str] | None = None,
+    ) -> str:
+        """
+        Add a document whose content is already in memory.
 
-        # Check for duplicates
-        for doc in self._documents.values():
-            if doc.content_hash == content_hash:
-                logger.info(f"Duplicate document detected: {file_path.name}")
-                return doc.id
+        Only formats that can be parsed from memory (HTML and PDF) are
+        accepted. The document has no file path; its filename is used in logs.
 
-        # Create document with contexts
+        Args:
+            data: Raw document content
+            filename: Document filename; its extension determines the format
+            metadata: Optional metadata dictionary
+            async_processing: If True, process asynchronously and return task ID
+            force_ocr: Force OCR even if text extraction is available
+            contexts: List of context names to add document to (default: ["default"])
+
+        Returns:
+            Task ID if async, document ID if sync
+        """
+        contexts = self._validate_contexts(contexts)
+
+        filename = sanitize_filename(filename)
+        document_format = validate_content(
+            data, filename, self.settings.processing.max_file_size_mb
+        )
+        if not self.text_extractor.supports_bytes(document_format):
+            raise ValueError(
+                f"Format {document_format.value} cannot be added from memory; add it from a file"
+            )
+
+        content_hash = await asyncio.to_thread(self._calculate_file_hash, None, data)
+        candidate_hashes = {content_hash}
+        if self._has_legacy_hashes:
+            candidate_hashes.add(
+                await asyncio.to_thread(self._calculate_legacy_file_hash, None, data)
+            )
+        existing_id = await self._find_existing_document(candidate_hashes)
+        if existing_id is not None:
+            logger.info(f"Duplicate document detected: {filename}")
+            return existing_id
+
+        # No file backs the document; its content is only passed to extraction
         document = Document(
-            filename=file_path.name,
-            file_path=str(file_path),
+            filename=filename,
+            file_path="",
             content_hash=content_hash,
             format=document_format,
-            size_bytes=file_path.stat().st_size,
+            size_bytes=len(data),
             contexts=contexts,
             metadata=metadata or {},
         )
+        self._register_document(document)
+        return await self._start_processing(document, data, async_processing, force_ocr)
 
-        self._documents[document.id] = document
-
+    async def _start_processing(
+        self,
+        document: Document,
+        content: bytes | None,
+        async_processing: bool,
+        force_ocr: bool,
+    ) -> str:
+        """Process an admitted document now, or in the background behind a task."""
         if async_processing:
             # Create async task
             task = ProcessingTask(document_id=document.id, total_steps=4)
@@ -163,16 +589,186 @@ class KnowledgeService:
 
             # Start processing in background
             asyncio.create_task(
-                self._process_document_async(task.task_id, document, force_ocr)
+                self._process_document_async(task.task_id, document, force_ocr, content)
             )
 
-            logger.info(f"Document queued for async processing: {file_path.name}")
+            logger.info(f"Document queued for async processing: {document.filename}")
             return task.task_id
         # Process synchronously
-        await self._process_document(document, force_ocr)
+        try:
+            await self._process_document(document, force_ocr, content)
+        except Exception as e:
+            await self.fail_document(document, e)
+            raise
         return document.id
 
-    async def _process_document_async(self, task_id: str, document: Document, force_ocr: bool = False) -> None:
+    async def admit_document(
+        self,
+        file_path: Path,
+        metadata: dict[str, Any] | None = None,
+        contexts: list[str] | None = None,
+    ) -> tuple[str, Document | None]:
+        """
+        Validate and hash a file, and register it as a new document unless it is a duplicate.
+
+        The file is hashed from a memory map and never read into this process;
+        extraction workers read it themselves.
+
+        Args:
+            file_path: Path to the document file
+            metadata: Optional metadata dictionary
+            contexts: List of context names to add document to (default: ["default"])
+
+        Returns:
+            Tuple of (document ID, new document or None for a duplicate)
+        """
+        contexts = self._validate_contexts(contexts)
+
+        # Validation (one stat call shared by every check)
+        document_format, stat_result = validate_file(
+            file_path, self.settings.processing.max_file_size_mb
+        )
+
+        # Reuse the cached hash when the file is unchanged since it was last hashed
+        content_hash = await asyncio.to_thread(self.hash_cache.get, file_path, stat_result)
+        if content_hash is None:
+            # Calculate hash for deduplication (off the event loop)
+            content_hash = await asyncio.to_thread(self._calculate_file_hash, file_path)
+            await asyncio.to_thread(self.hash_cache.put, file_path, stat_result, content_hash)
+
+        # Check for duplicates (documents stored before BLAKE3 carry SHA-256 hashes)
+        candidate_hashes = {content_hash}
+        if self._has_legacy_hashes:
+            candidate_hashes.add(
+                await asyncio.to_thread(self._calculate_legacy_file_hash, file_path)
+            )
+        existing_id = await self._find_existing_document(candidate_hashes)
+        if existing_id is not None:
+            logger.info(f"Duplicate document detected: {file_path.name}")
+            return existing_id, None
+
+        # Create document with contexts
+        document = Document(
+            filename=file_path.name,
+            file_path=str(file_path),
+            content_hash=content_hash,
+            format=document_format,
+            size_bytes=stat_result.st_size,
+            contexts=contexts,
+            metadata=metadata or {},
+        )
+
+        # Registered before any later await so concurrent adds see the duplicate
+        self._register_document(document)
+        return document.id, document
+
+    def _validate_contexts(self, contexts: list[str] | None) -> list[str]:
+        """Default to ["default"] and check that every context exists."""
+        if not contexts:
+            contexts = ["default"]
+
+        for ctx in contexts:
+            if not self.context_service.context_exists(ctx):
+                raise ValueError(f"Context '{ctx}' does not exist")
+        return contexts
+
+    async def _find_existing_document(self, candidate_hashes: set[str]) -> str | None:
+        """Find a document with any of the given content hashes, in memory or stored."""
+        existing_id = self._find_duplicate(candidate_hashes)
+        if existing_id is not None:
+            return existing_id
+
+        # Fall back to the vector store in case a stored document was not loaded
+        for candidate_hash in candidate_hashes:
+            stored_id = await self.vector_store.find_by_content_hash(candidate_hash)
+            if stored_id is None:
+                continue
+            if stored_id in self._documents:
+                # Chunks of a known document outside the hash index (one that
+                # failed part way); its content is ingested again
+                continue
+            restored = await self._restore_document(stored_id)
+            if restored is not None:
+                return restored
+
+        # A concurrent add may have registered the file during the lookup
+        return self._find_duplicate(candidate_hashes)
+
+    async def _restore_document(self, document_id: str) -> str | None:
+        """
+        Register a document found in the vector store but not loaded, from its chunk metadata.
+
+        This covers chunks written by a document that was removed while still
+        processing, so they can be found and removed like any other document.
+
+        Returns:
+            ID of the registered document, or None if it has no chunks left
+        """
+        metadatas = await self.vector_store.get_chunk_metadata(document_id)
+        if document_id in self._documents:
+            # Restored by a concurrent add during the lookup
+            return document_id
+        if not metadatas:
+            return None
+
+        chunks_per_context = Counter(metadata.get("context", "default") for metadata in metadatas)
+        try:
+            document = self._document_from_chunk_metadata(
+                document_id,
+                metadatas[0],
+                max(chunks_per_context.values()),
+                contexts=list(chunks_per_context),
+            )
+        except Exception as e:
+            logger.warning(f"Could not restore stored document {document_id}: {e}")
+            return None
+        await self._invalidate_snapshot()
+        existing_id = self._find_duplicate({document.content_hash})
+        if existing_id is not None or document_id in self._documents:
+            # A concurrent add registered the same content during the lookup
+            return existing_id or document_id
+
+        self._register_document(document)
+        for context in document.contexts:
+            self.context_service.add_to_count(context, 1)
+        self.context_service.flush()
+        self._schedule_snapshot()
+        logger.info(f"Restored stored document {document.filename} from the vector store")
+        return document.id
+
+    async def add_documents(
+        self,
+        file_paths: list[Path],
+        metadata: dict[str, Any] | None = None,
+        force_ocr: bool = False,
+        contexts: list[str] | None = None,
+    ) -> list[str | BaseException]:
+        """
+        Add several documents through a staged ingestion pipeline.
+
+        Extraction of up to ``processing.max_concurrent_tasks`` files overlaps
+        with chunking, embedding and vector store writes of earlier files,
+        and chunks from different files share embedding and write batches.
+
+        Args:
+            file_paths: Paths to the document files
+            metadata: Optional metadata dictionary applied to every document
+            force_ocr: Force OCR even if text extraction is available
+            contexts: List of context names to add documents to (default: ["default"])
+
+        Returns:
+            Document ID or the raised exception for each path, in input order
+        """
+        pipeline = IngestPipeline(self, metadata=metadata, force_ocr=force_ocr, contexts=contexts)
+        return await pipeline.run(file_paths)
+
+    async def _process_document_async(
+        self,
+        task_id: str,
+        document: Document,
+        force_ocr: bool = False,
+        content: bytes | None = None,
+    ) -> None:
         """Process document asynchronously with progress tracking."""
         task = self._tasks[task_id]
         task.status = TaskStatus.RUNNING
@@ -182,7 +778,7 @@ class KnowledgeService:
             task.completed_steps = 1
             task.progress = 0.25
 
-            await self._process_document(document, force_ocr)
+            await self._process_document(document, force_ocr, content)
 
             task.status = TaskStatus.COMPLETED
             task.progress = 1.0
@@ -191,106 +787,274 @@ class KnowledgeService:
         except Exception as e:
             task.status = TaskStatus.FAILED
             task.error = str(e)
-            document.processing_status = ProcessingStatus.FAILED
-            document.error_message = str(e)
-            logger.error(f"Document processing failed: {e}")
+            await self.fail_document(document, e)
 
-    async def _process_document(self, document: Document, force_ocr: bool = False) -> None:
-        """Process a single document."""
-        document.processing_status = ProcessingStatus.PROCESSING
+    async def fail_document(self, document: Document, error: BaseException) -> None:
+        """
+        Mark a document as failed and delete any chunks it had already stored.
 
-        # Temporarily override force_ocr setting if requested
-        original_force_ocr = self.text_extractor.ocr_service.force_ocr
-        if force_ocr:
-            self.text_extractor.ocr_service.force_ocr = True
+        The document gives up its content hash, so adding the same content
+        again ingests it afresh instead of returning the failed document.
 
-        try:
-            # Extract text
-            text, metadata, processing_method = await self.text_extractor.extract(
-                Path(document.file_path),
-                document.format,
-            )
+        Args:
+            document: Document being processed
+            error: Exception that stopped processing
+        """
+        if self._hash_index.get(document.content_hash) == document.id:
+            del self._hash_index[document.content_hash]
+        self._set_status(document, ProcessingStatus.FAILED)
+        document.error_message = str(error)
+        logger.error(f"Document processing failed: {error}")
 
-            document.processing_method = processing_method
-            document.metadata.update(metadata)
+        # Batches written before the failure would otherwise be duplicated by a retry
+        for context in document.contexts:
+            try:
+                await self.begin_vector_write()
+                await self.vector_store.delete_document_chunks(document.id, context)
+            except Exception as e:
+                logger.warning(
+                    f"Could not delete chunks of failed document {document.id} "
+                    f"from context '{context}': {e}"
+                )
 
-            if not text or len(text.strip()) < 10:
-                logger.warning(f"No text extracted from {document.filename}")
-                document.processing_status = ProcessingStatus.COMPLETED
-                return
+    async def _process_document(
+        self,
+        document: Document,
+        force_ocr: bool = False,
+        content: bytes | None = None,
+    ) -> None:
+        """Process a single document, parsing ``content`` if it was added from memory."""
+        text = await self.extract_text(document, force_ocr, content)
+        if text is None:
+            return
+
+        # Chunk, embed and store in batches
+        chunk_count = await self._embed_and_store(document, await self.split_text(text))
+        await self.complete_document(document, chunk_count)
+
+    async def extract_text(
+        self,
+        document: Document,
+        force_ocr: bool = False,
+        content: bytes | None = None,
+    ) -> str | None:
+        """
+        Mark a document processing and extract its text in the process pool.
 
-            # Chunk text
-            chunks = chunk_text(
-                text,
-                strategy=self.settings.chunking.strategy,
-                chunk_size=self.settings.chunking.chunk_size,
-                overlap=self.settings.chunking.chunk_overlap,
-            )
+        Args:
+            document: Document returned by admit_document or add_document_bytes
+            force_ocr: Force OCR even if text extraction is available
+            content: Document content, for documents added from memory
 
-            if not chunks:
-                logger.warning(f"No chunks created from {document.filename}")
-                document.processing_status = ProcessingStatus.COMPLETED
-                return
+        Returns:
+            Extracted text, or None if there was too little text to index
+            (the document is then marked completed)
+        """
+        self._set_status(document, ProcessingStatus.PROCESSING)
+
+        # Extract text in the process pool
+        loop = asyncio.get_running_loop()
+        text, metadata, processing_method = await loop.run_in_executor(
+            self._extract_pool,
+            _extract_sync,
+            # Documents added from memory have no path; their filename names them in logs
+            document.file_path or document.filename,
+            document.format,
+            force_ocr or self.text_extractor.ocr_service.force_ocr,
+            self.text_extractor.ocr_service.language,
+            self.text_extractor.ocr_service.dpi,
+            self.text_extractor.ocr_service.preprocess,
+            self._ocr_threads,
+            content,
+        )
 
-            # Generate embeddings
-            embeddings = await self.embedding_service.encode(
-                chunks,
-                batch_size=self.settings.embedding.batch_size,
-            )
+        document.processing_method = processing_method
+        document.metadata.update(metadata)
 
-            # Store in vector database - add to each context
-            for context in document.contexts:
-                # Create unique embedding IDs per context
-                context_embedding_ids = [f"{context}_{str(uuid4())}" for _ in chunks]
-                
-                context_metadatas = []
-                for i in range(len(chunks)):
-                    context_metadatas.append(
-                        {
-                            "document_id": document.id,
-                            "filename": document.filename,
-                            "file_path": document.file_path,
-                            "content_hash": document.content_hash,
-                            "size_bytes": document.size_bytes,
-                            "chunk_index": i,
-                            "format": document.format.value,
-                            "context": context,
-                            "processing_method": (
-                                document.processing_method.value
-                                if document.processing_method
-                                else "unknown"
-                            ),
-                        }
+        if not text or len(text.strip()) < 10:
+            logger.warning(f"No text extracted from {document.filename}")
+            self._set_status(document, ProcessingStatus.COMPLETED)
+            return None
+        return text
+
+    async def complete_document(self, document: Document, chunk_count: int) -> None:
+        """
+        Record a document's stored chunks, mark it completed and schedule a snapshot.
+
+        Args:
+            document: Document whose chunks have all been written
+            chunk_count: Number of chunks stored in each of its contexts
+        """
+        if not chunk_count:
+            logger.warning(f"No chunks created from {document.filename}")
+            self._set_status(document, ProcessingStatus.COMPLETED)
+            return
+
+        # A snapshot written while the document was processing lacks it
+        await self._invalidate_snapshot()
+
+        # Update context document counts once every write has succeeded
+        for context in document.contexts:
+            self.context_service.add_to_count(context, 1)
+        self.context_service.flush()
+
+        # Update document
+        document.chunk_count = chunk_count
+        if self._documents.get(document.id) is document:
+            self._total_chunks += chunk_count
+        self._set_status(document, ProcessingStatus.COMPLETED)
+        self._schedule_snapshot()
+
+        logger.info(
+            f"Document processed: {document.filename} - "
+            f"{chunk_count} chunks in contexts: {', '.join(document.contexts)}"
+        )
+
+    async def _embed_and_store(self, document: Document, chunks: Iterable[str]) -> int:
+        """
+        Embed chunks and write them to every context of a document, one batch at a time.
+
+        Only one batch of embeddings is held at once, and vector store writes
+        run in the background (at most _MAX_PENDING_WRITES at a time) while the
+        next batch is encoded.
+
+        Returns:
+            Number of chunks stored
+        """
+        batch_size = self.settings.embedding.batch_size
+        chunk_metadata = self.chunk_metadata(document)
+        # Embedding IDs are "<context>_<run hex>_<chunk index>": one random
+        # UUID per context keeps them unique without one per chunk
+        run_ids = {context: uuid4().hex for context in document.contexts}
+
+        write_slots = asyncio.Semaphore(_MAX_PENDING_WRITES)
+        writes: list[asyncio.Task] = []
+        chunk_count = 0
+        try:
+            for batch in _batched(chunks, batch_size):
+                embeddings = await self.embedding_service.encode_array(batch, batch_size=batch_size)
+
+                # One length check per batch instead of a per-row strict zip
+                if len(embeddings) != len(batch):
+                    raise RuntimeError(
+                        f"Embedding count ({len(embeddings)}) does not match "
+                        f"chunk count ({len(batch)})"
                     )
-                
-                # Add to vector store for this context
-                await self.vector_store.add_embeddings(
-                    collection_name="knowledge_base_documents",  # Legacy parameter
-                    ids=context_embedding_ids,
-                    embeddings=embeddings,
-                    documents=chunks,
-                    metadatas=context_metadatas,
-                    context=context,
-                )
-                
-                # Update context document count
-                try:
-                    self.context_service.increment_document_count(context)
-                except Exception as e:
-                    logger.warning(f"Could not update document count for context '{context}': {e}")
-
-            # Update document
-            document.chunk_count = len(chunks)
-            document.processing_status = ProcessingStatus.COMPLETED
-
-            logger.info(
-                f"Document processed: {document.filename} - "
-                f"{len(chunks)} chunks in contexts: {', '.join(document.contexts)}"
+
+                first_index = chunk_count
+                chunk_count += len(batch)
+                indexes = range(first_index, chunk_count)
+
+                # Chunk metadata shared by every context; only "context" differs
+                base_metadatas = [{**chunk_metadata, "chunk_index": i} for i in indexes]
+
+                # Only the first batch advances the write generation
+                await self.begin_vector_write()
+                for context in document.contexts:
+                    await write_slots.acquire()
+                    writes.append(
+                        asyncio.create_task(
+                            self._write_batch(
+                                write_slots,
+                                context,
+                                ids=[f"{context}_{run_ids[context]}_{i}" for i in indexes],
+                                embeddings=embeddings,
+                                documents=batch,
+                                metadatas=[{**m, "context": context} for m in base_metadatas],
+                            )
+                        )
+                    )
+        finally:
+            # Let in-flight writes finish even if encoding failed part way
+            results = await asyncio.gather(*writes, return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        return chunk_count
+
+    @staticmethod
+    def chunk_metadata(document: Document) -> dict[str, Any]:
+        """
+        Metadata stored with every chunk of a document.
+
+        Args:
+            document: Document the chunks belong to
+
+        Returns:
+            Metadata dictionary; callers add "chunk_index" and "context" per chunk
+        """
+        return {
+            "document_id": document.id,
+            "filename": document.filename,
+            "file_path": document.file_path,
+            "content_hash": document.content_hash,
+            "hash_algorithm": _HASH_ALGORITHM,
+            "size_bytes": document.size_bytes,
+            "format": document.format.value,
+            "processing_method": (
+                document.processing_method.value if document.processing_method else "unknown"
+            ),
+        }
+
+    async def _write_batch(
+        self,
+        write_slots: asyncio.Semaphore,
+        context: str,
+        ids: list[str],
+        embeddings: np.ndarray,
+        documents: list[str],
+        metadatas: list[dict[str, Any]],
+    ) -> None:
+        """Write one batch to a context and release its write slot."""
+        try:
+            await self.vector_store.add_embeddings(
+                collection_name="knowledge_base_documents",  # Legacy parameter
+                ids=ids,
+                embeddings=embeddings,
+                documents=documents,
+                metadatas=metadatas,
+                context=context,
             )
         finally:
-            # Restore original force_ocr setting
-            if force_ocr:
-                self.text_extractor.ocr_service.force_ocr = original_force_ocr
+            write_slots.release()
+
+    async def split_text(self, text: str) -> Iterable[str]:
+        """
+        Chunk extracted text, splitting very large texts across worker processes.
+
+        Ordinary texts are chunked lazily so chunks can be embedded as they
+        are produced.
+
+        Large texts are cut into sections on paragraph boundaries and each
+        section is chunked independently, so no chunk spans a section cut.
+
+        Args:
+            text: Text returned by extract_text
+
+        Returns:
+            Chunks using the configured chunking settings
+        """
+        strategy = self.settings.chunking.strategy
+        chunk_size = self.settings.chunking.chunk_size
+        overlap = self.settings.chunking.chunk_overlap
+
+        if len(text) <= _PARALLEL_CHUNK_THRESHOLD:
+            return make_chunker(strategy, chunk_size, overlap)(text)
+
+        sections = split_into_sections(text, self.settings.processing.extract_workers)
+        loop = asyncio.get_running_loop()
+        section_chunks = await asyncio.gather(
+            *[
+                loop.run_in_executor(
+                    self._extract_pool, chunk_text, section, strategy, chunk_size, overlap
+                )
+                for section in sections
+            ]
+        )
+        logger.debug("Chunked %d characters in %d parallel sections", len(text), len(sections))
+        return [chunk for chunks in section_chunks for chunk in chunks]
 
     def get_task_status(self, task_id: str) -> ProcessingTask | None:
         """Get status of processing task."""
@@ -308,7 +1072,7 @@ class KnowledgeService:
         """
         if context:
             # Filter documents by context
-            return [doc for doc in self._documents.values() if context in doc.contexts]
+            return [self._documents[doc_id] for doc_id in self._by_context.get(context, ())]
         return list(self._documents.values())
 
     def get_document(self, document_id: str) -> Document | None:
@@ -336,39 +1100,85 @@ class KnowledgeService:
         Returns:
             List of search results with relevance scores
         """
-        if not query or not query.strip():
+        results = await self.search_batch(
+            [query],
+            top_k=top_k,
+            min_relevance=min_relevance,
+            filters=filters,
+            context=context,
+        )
+        return results[0]
+
+    async def search_batch(
+        self,
+        queries: list[str],
+        top_k: int = 10,
+        min_relevance: float = 0.0,
+        filters: dict[str, Any] | None = None,
+        context: str | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        """
+        Search the knowledge base with several queries at once.
+
+        Uncached queries are embedded in a single model call and each
+        collection is queried once for all of them.
+
+        Args:
+            queries: Natural language search queries
+            top_k: Number of results to return per query
+            min_relevance: Minimum relevance score threshold
+            filters: Optional metadata filters
+            context: Optional context name (None = search all contexts)
+
+        Returns:
+            List of search results with relevance scores for each query, in order
+        """
+        if not queries or any(not query or not query.strip() for query in queries):
             raise ValueError("Query cannot be empty")
 
-        # Generate query embedding
-        query_embedding = await self.embedding_service.encode_single(query)
+        # Generate query embeddings (cached for repeated queries)
+        query_embeddings = await self._encode_queries(queries)
 
         # Search vector store (context-aware)
-        results = await self.vector_store.search(
-            collection_name="knowledge_base_documents",
-            query_embedding=query_embedding,
+        batch_results = await self.vector_store.search_batch(
+            query_embeddings,
             top_k=top_k,
             where=filters,
             context=context,
         )
 
-        # Format results
-        search_results = []
-        for i, chunk_id in enumerate(results["ids"][0]):
-            relevance_score = 1.0 - results["distances"][0][i]  # Convert distance to similarity
+        return [
+            self._format_search_results(query, results, min_relevance, context)
+            for query, results in zip(queries, batch_results, strict=True)
+        ]
 
-            if relevance_score < min_relevance:
-                continue
+    @staticmethod
+    def _format_search_results(
+        query: str,
+        results: dict[str, Any],
+        min_relevance: float,
+        context: str | None,
+    ) -> list[dict[str, Any]]:
+        """Convert vector store results for one query into scored search results."""
+        # Convert distances to similarities and drop low scores in one vectorized pass
+        chunk_ids = results["ids"][0]
+        metadatas = results["metadatas"][0]
+        documents = results["documents"][0]
+        scores = 1.0 - np.asarray(results["distances"][0], dtype=np.float64)
+        keep = np.nonzero(scores >= min_relevance)[0]
 
-            metadata = results["metadatas"][0][i]
-            chunk_text = results["documents"][0][i]
+        # Format results
+        search_results = []
+        for i in keep:
+            metadata = metadatas[i]
 
             search_results.append(
                 {
-                    "chunk_id": chunk_id,
+                    "chunk_id": chunk_ids[i],
                     "document_id": metadata.get("document_id"),
                     "filename": metadata.get("filename"),
-                    "chunk_text": chunk_text,
-                    "relevance_score": relevance_score,
+                    "chunk_text": documents[i],
+                    "relevance_score": float(scores[i]),
                     "chunk_index": metadata.get("chunk_index"),
                     "format": metadata.get("format"),
                     "context": metadata.get("context"),
@@ -376,11 +1186,87 @@ class KnowledgeService:
                 }
             )
 
-        context_info = f" in context '{context}'" if context else " across all contexts"
-        logger.info(f"Search query '{query[:50]}...'{context_info} returned {len(search_results)} results")
+        logger.info(
+            "Search query '%.50s...'%s returned %d results",
+            query,
+            f" in context '{context}'" if context else " across all contexts",
+            len(search_results),
+        )
 
         return search_results
 
+    async def _encode_queries(self, queries: list[str]) -> list[list[float]]:
+        """
+        Get the embeddings for search queries, reusing cached embeddings.
+
+        Queries missing from the cache are embedded together in one call.
+        Queries another search is already encoding wait for that result
+        instead of being encoded again. The cache is only touched between
+        awaits, so no lock is held while the model runs.
+        """
+        # Keyed on the exact text: cased models embed "Apple" and "apple" differently
+        keys = [hashlib.sha256(query.encode()).hexdigest() for query in queries]
+        ttl = self.settings.embedding.query_cache_ttl
+        now = time.monotonic()
+        embeddings: dict[str, list[float]] = {}
+        waiting: dict[str, asyncio.Future[list[float]]] = {}
+        misses: dict[str, str] = {}
+        for key, query in zip(keys, queries, strict=True):
+            if key in embeddings or key in waiting or key in misses:
+                continue
+            cached = self._query_cache.get(key)
+            if cached is not None:
+                embedding, cached_at = cached
+                if not ttl or now - cached_at < ttl:
+                    self._query_cache.move_to_end(key)
+                    embeddings[key] = embedding
+                    continue
+                del self._query_cache[key]
+            pending = self._pending_queries.get(key)
+            if pending is not None:
+                waiting[key] = pending
+            else:
+                misses[key] = query
+
+        if misses:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in misses}
+            self._pending_queries.update(futures)
+            try:
+                encoded = await self.embedding_service.encode(
+                    list(misses.values()), batch_size=len(misses)
+                )
+                now = time.monotonic()
+                for (key, future), embedding in zip(futures.items(), encoded, strict=True):
+                    if len(self._query_cache) >= _QUERY_CACHE_SIZE:
+                        # Evict the least recently used entry
+                        self._query_cache.popitem(last=False)
+                    self._query_cache[key] = (embedding, now)
+                    embeddings[key] = embedding
+                    future.set_result(embedding)
+            except Exception as e:
+                for future in futures.values():
+                    if not future.done():
+                        future.set_exception(e)
+                        # Mark it retrieved; there may be no one waiting
+                        future.exception()
+                raise
+            finally:
+                for key, future in futures.items():
+                    del self._pending_queries[key]
+                    # Cancelled while encoding: waiters are cancelled too
+                    future.cancel()
+
+        for key, future in waiting.items():
+            # Shielded so a cancelled search doesn't cancel the other searches waiting
+            embeddings[key] = await asyncio.shield(future)
+
+        return [embeddings[key] for key in keys]
+
+    def clear_query_cache(self) -> None:
+        """Drop cached query embeddings, e.g. after the embedding model changes."""
+        self._query_cache.clear()
+
     async def remove_document(self, document_id: str) -> bool:
         """
         Remove a document from the knowledge base and all contexts.
@@ -396,6 +1282,9 @@ class KnowledgeService:
             logger.warning(f"Document not found: {document_id}")
             return False
 
+        # Invalidate the snapshot before its embeddings change
+        await self._invalidate_snapshot()
+
         # Remove embeddings from each context
         for context in document.contexts:
             try:
@@ -407,16 +1296,22 @@ class KnowledgeService:
                     collection.delete(ids=embedding_ids)
                     logger.info(f"Removed {len(embedding_ids)} embeddings for document {document_id} from context '{context}'")
                 
-                # Update context document count
-                try:
-                    self.context_service.decrement_document_count(context)
-                except Exception as e:
-                    logger.warning(f"Could not update document count for context '{context}': {e}")
+                # Update context document count (applied below)
+                self.context_service.add_to_count(context, -1)
             except Exception as e:
                 logger.error(f"Error removing embeddings for document {document_id} from context '{context}': {e}")
 
+        self.context_service.flush()
+
+        # Forget the file's cached hash; documents added from memory have no file
+        if document.file_path:
+            try:
+                await asyncio.to_thread(self.hash_cache.delete, Path(document.file_path))
+            except Exception as e:
+                logger.warning(f"Could not remove cached hash for {document.file_path}: {e}")
+
         # Remove document
-        del self._documents[document_id]
+        self._unregister_document(document)
         logger.info(f"Removed document: {document.filename}")
 
         return True
@@ -430,12 +1325,26 @@ class KnowledgeService:
         """
         count = len(self._documents)
 
-        # Reset vector store
-        self.vector_store.reset()
+        # Reset vector store (which also drops the write generation); the old
+        # snapshot goes first so it cannot match the reset generation
+        if self._snapshot_path is not None:
+            await asyncio.to_thread(self._snapshot_path.unlink, missing_ok=True)
+        await asyncio.to_thread(self.vector_store.reset)
+        await asyncio.to_thread(self.hash_cache.clear)
+        self._snapshot_dirty = False
+        await self._invalidate_snapshot()
 
         # Clear documents
         self._documents.clear()
+        self._hash_index.clear()
+        self._by_context.clear()
+        self._status_counts.clear()
+        self._format_counts.clear()
+        self._total_chunks = 0
+        self._total_bytes = 0
         self._tasks.clear()
+        self._has_legacy_hashes = False
+        self._schedule_snapshot()
 
         logger.info(f"Cleared knowledge base: {count} documents removed")
 
@@ -491,7 +1400,8 @@ class KnowledgeService:
         Returns:
             Success message
         """
-        # Remove from ChromaDB
+        # Remove from ChromaDB, invalidating the snapshot before its embeddings go
+        self._advance_generation()
         try:
             self.vector_store.delete_collection(name)
         except Exception as e:
@@ -507,27 +1417,23 @@ class KnowledgeService:
         Returns:
             Dictionary with statistics
         """
-        total_chunks = sum(doc.chunk_count for doc in self._documents.values())
-        total_size = sum(doc.size_bytes for doc in self._documents.values())
-
-        completed = [
-            d for d in self._documents.values() if d.processing_status == ProcessingStatus.COMPLETED
-        ]
-        failed = [
-            d for d in self._documents.values() if d.processing_status == ProcessingStatus.FAILED
-        ]
-
         return {
             "document_count": len(self._documents),
-            "total_chunks": total_chunks,
-            "total_size_mb": total_size / (1024 * 1024),
+            "total_chunks": self._total_chunks,
+            "total_size_mb": self._total_bytes / (1024 * 1024),
             "average_chunks_per_document": (
-                total_chunks / len(self._documents) if self._documents else 0
+                self._total_chunks / len(self._documents) if self._documents else 0
             ),
-            "completed": len(completed),
-            "failed": len(failed),
-            "formats": {
-                fmt.value: sum(1 for d in self._documents.values() if d.format == fmt)
-                for fmt in DocumentFormat
-            },
+            "completed": self._status_counts[ProcessingStatus.COMPLETED],
+            "failed": self._status_counts[ProcessingStatus.FAILED],
+            "formats": {fmt.value: self._format_counts[fmt] for fmt in DocumentFormat},
         }
+
+    def close(self) -> None:
+        """Write any pending snapshot and release worker processes and the hash cache."""
+        if self._snapshot_task is not None and not self._snapshot_task.done():
+            self._snapshot_task.cancel()
+        if self._snapshot_dirty:
+            self._write_snapshot(self._snapshot_bytes())
+        self._extract_pool.shutdown(wait=True, cancel_futures=True)
+        self.hash_cache.close()
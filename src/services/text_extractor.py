@@ -21,16 +21,32 @@ logger = get_logger(__name__)
 class TextExtractor:
     """Service for extracting text from various document formats."""
 
-    def __init__(self, force_ocr: bool = False, ocr_language: str = "eng"):
+    def __init__(
+        self,
+        force_ocr: bool = False,
+        ocr_language: str = "eng",
+        ocr_dpi: int = 200,
+        ocr_preprocess: bool = False,
+        ocr_threads: int | None = None,
+    ):
         """
         Initialize text extractor with OCR support.
 
         Args:
             force_ocr: Force OCR processing even when text extraction is available
             ocr_language: Language code for OCR processing
+            ocr_dpi: Resolution for rasterizing PDF pages for OCR
+            ocr_preprocess: Binarize images with adaptive thresholding before OCR
+            ocr_threads: Threads for OCR and PDF rendering (default: one per CPU core)
         """
         # Initialize OCR service
-        self.ocr_service = OCRService(language=ocr_language, force_ocr=force_ocr)
+        self.ocr_service = OCRService(
+            language=ocr_language,
+            force_ocr=force_ocr,
+            max_workers=ocr_threads,
+            dpi=ocr_dpi,
+            preprocess=ocr_preprocess,
+        )
 
         # Initialize processors with OCR support
         self._processors = {
@@ -63,5 +79,37 @@ class TextExtractor:
         if not processor:
             raise ValueError(f"No processor available for format: {document_format}")
 
-        logger.info(f"Extracting text from {file_path.name} ({document_format.value})")
+        logger.info("Extracting text from %s (%s)", file_path.name, document_format.value)
         return await processor.process(file_path)
+
+    def supports_bytes(self, document_format: DocumentFormat) -> bool:
+        """Whether the processor for this format can parse from memory."""
+        processor = self._processors.get(document_format)
+        return processor is not None and processor.supports_bytes
+
+    async def extract_bytes(
+        self,
+        data: bytes,
+        document_format: DocumentFormat,
+        file_path: Path,
+    ) -> tuple[str, dict[str, Any], ProcessingMethod]:
+        """
+        Extract text and metadata from document content already in memory.
+
+        Formats whose processor needs a real file (e.g. DOCX) fall back to
+        reading ``file_path``.
+
+        Args:
+            data: Raw file content
+            document_format: Document format
+            file_path: Path to document file
+
+        Returns:
+            Tuple of (text, metadata, processing_method)
+        """
+        processor = self._processors.get(document_format)
+        if not processor:
+            raise ValueError(f"No processor available for format: {document_format}")
+
+        logger.info("Extracting text from %s (%s, in memory)", file_path.name, document_format.value)
+        return await processor.process_bytes(data, file_path)
@@ -2,40 +2,88 @@
 ChromaDB client wrapper for vector storage.
 """
 
+from __future__ import annotations
+
+import asyncio
+import heapq
+import os
+from collections.abc import Iterator
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import chromadb
-from chromadb.api.models.Collection import Collection
-from chromadb.config import Settings as ChromaSettings
+import numpy as np
 
 from src.utils.logging_config import get_logger
 
+if TYPE_CHECKING:
+    from chromadb.api.models.Collection import Collection
+
 logger = get_logger(__name__)
 
+# Chroma reads this when its settings load, before any client is created
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+# Embeddings are L2-normalized when encoded, so inner product ranks exactly
+# like cosine (distance = 1 - cos) without renormalizing every vector.
+# Only new collections get it; Chroma can't change an existing collection's
+# space, so older "cosine" collections keep theirs (same distances).
+_DISTANCE_SPACE = "ip"
+
+# Space Chroma uses for collections created without one
+_DEFAULT_SPACE = "l2"
+
+# Collection whose metadata holds the write generation; not a context
+_STATE_COLLECTION = "knowledge_state"
+
 
 class VectorStore:
     """ChromaDB wrapper for vector storage operations with multi-context support."""
 
-    def __init__(self, persist_directory: Path):
+    def __init__(
+        self,
+        persist_directory: Path,
+        write_batch_size: int = 128,
+        in_memory: bool = False,
+    ):
         """
         Initialize ChromaDB client.
 
         Args:
             persist_directory: Directory for persistent storage
+            write_batch_size: Default number of embeddings per insert
+            in_memory: Keep vectors in memory only, skipping all disk writes
         """
         self.persist_directory = persist_directory
-        self.persist_directory.mkdir(parents=True, exist_ok=True)
-
-        self._client = chromadb.PersistentClient(
-            path=str(persist_directory),
-            settings=ChromaSettings(
-                anonymized_telemetry=False,
-                allow_reset=True,
-            ),
+        self.write_batch_size = write_batch_size
+        if not in_memory:
+            self.persist_directory.mkdir(parents=True, exist_ok=True)
+
+        # Imported here so importing this module doesn't pay chromadb's import cost
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+
+        chroma_settings = ChromaSettings(
+            anonymized_telemetry=False,
+            allow_reset=True,
         )
+        if in_memory:
+            self._client = chromadb.EphemeralClient(settings=chroma_settings)
+        else:
+            self._client = chromadb.PersistentClient(
+                path=str(persist_directory),
+                settings=chroma_settings,
+            )
 
-        logger.info(f"ChromaDB initialized at {persist_directory}")
+        # Collection handles by context, so hot paths skip get_or_create_collection
+        self._collection_cache: dict[str, Collection] = {}
+        # Context names from list_collections, rebuilt after collections change
+        self._context_list_cache: list[str] | None = None
+        self._state_collection: Collection | None = None
+
+        location = "in memory" if in_memory else f"at {persist_directory}"
+        logger.info(f"ChromaDB initialized {location}")
     
     @staticmethod
     def _collection_name(context: str) -> str:
@@ -61,8 +109,8 @@ class VectorStore:
         Returns:
             Context name or None if not a context collection
         """
-        if collection_name.startswith("context_"):
-            return collection_name[8:]  # Remove "context_" prefix
+        if collection_name[:8] == "context_":
+            return collection_name.removeprefix("context_")
         return None
 
     def get_collection(self, context: str = "default") -> Collection:
@@ -75,11 +123,14 @@ class VectorStore:
         Returns:
             ChromaDB collection instance
         """
-        collection_name = self._collection_name(context)
-        return self._client.get_or_create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine", "context": context}
-        )
+        collection = self._collection_cache.get(context)
+        if collection is None:
+            collection = self._open_collection(
+                self._collection_name(context), {"context": context}
+            )
+            self._collection_cache[context] = collection
+            self._context_list_cache = None
+        return collection
     
     def create_collection(self, context: str) -> Collection:
         """
@@ -91,11 +142,9 @@ class VectorStore:
         Returns:
             ChromaDB collection instance
         """
-        collection_name = self._collection_name(context)
-        collection = self._client.get_or_create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine", "context": context}
-        )
+        collection = self._open_collection(self._collection_name(context), {"context": context})
+        self._collection_cache[context] = collection
+        self._context_list_cache = None
         logger.info(f"Created collection for context: {context}")
         return collection
     
@@ -107,6 +156,8 @@ class VectorStore:
             context: Context name
         """
         collection_name = self._collection_name(context)
+        self._collection_cache.pop(context, None)
+        self._context_list_cache = None
         try:
             self._client.delete_collection(name=collection_name)
             logger.info(f"Deleted collection for context: {context}")
@@ -120,13 +171,14 @@ class VectorStore:
         Returns:
             List of context names
         """
-        collections = self._client.list_collections()
-        contexts = []
-        for collection in collections:
-            context = self._context_from_collection(collection.name)
-            if context:
-                contexts.append(context)
-        return contexts
+        if self._context_list_cache is None:
+            contexts = []
+            for collection in self._client.list_collections():
+                context = self._context_from_collection(collection.name)
+                if context:
+                    contexts.append(context)
+            self._context_list_cache = contexts
+        return list(self._context_list_cache)
 
     def get_or_create_collection(self, name: str = "knowledge_base_documents") -> Collection:
         """
@@ -138,16 +190,65 @@ class VectorStore:
         Returns:
             ChromaDB collection instance
         """
-        return self._client.get_or_create_collection(name=name, metadata={"hnsw:space": "cosine"})
+        return self._open_collection(name)
+
+    def _open_collection(self, name: str, metadata: dict[str, Any] | None = None) -> Collection:
+        """
+        Open a collection, creating it with the distance space if it doesn't exist.
+
+        The space is only passed at creation: an existing collection keeps
+        the space it was created with (see distance_space).
+
+        Args:
+            name: Collection name
+            metadata: Metadata for a new collection
+
+        Returns:
+            ChromaDB collection instance
+        """
+        try:
+            return self._client.get_collection(name=name)
+        except Exception:
+            # Missing (the error type differs between Chroma versions); another
+            # process may create it first, so get it if it exists by now
+            return self._client.get_or_create_collection(
+                name=name, metadata={"hnsw:space": _DISTANCE_SPACE, **(metadata or {})}
+            )
+
+    @staticmethod
+    def distance_space(collection: Collection) -> str:
+        """
+        Get the distance space a collection was created with.
+
+        Args:
+            collection: ChromaDB collection instance
+
+        Returns:
+            "ip", "cosine" or "l2"
+        """
+        return (collection.metadata or {}).get("hnsw:space", _DEFAULT_SPACE)
+
+    @classmethod
+    def _cosine_distances(cls, collection: Collection, results: dict[str, Any]) -> dict[str, Any]:
+        """
+        Rescale query results to cosine distances (1 - cos) for the collection's space.
+
+        ip and cosine distances already are; squared L2 between unit vectors
+        is 2 - 2cos, so it is halved.
+        """
+        if cls.distance_space(collection) == "l2":
+            results["distances"] = [[d / 2 for d in row] for row in results["distances"]]
+        return results
 
     async def add_embeddings(
         self,
         collection_name: str,
         ids: list[str],
-        embeddings: list[list[float]],
+        embeddings: np.ndarray | list[list[float]],
         documents: list[str],
         metadatas: list[dict[str, Any]],
         context: str = "default",
+        batch_size: int | None = None,
     ) -> None:
         """
         Add embeddings to the vector store.
@@ -155,19 +256,27 @@ class VectorStore:
         Args:
             collection_name: Name of the collection (legacy parameter, will be replaced by context)
             ids: List of unique IDs for each embedding
-            embeddings: List of embedding vectors
+            embeddings: Embedding vectors (array or list of lists)
             documents: List of text documents
             metadatas: List of metadata dictionaries
             context: Context name for multi-context support
+            batch_size: Embeddings per insert (default: write_batch_size)
         """
         collection = self.get_collection(context)
-        collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas,
-        )
-        logger.info(f"Added {len(ids)} embeddings to context '{context}'")
+        # One contiguous float32 buffer; each batch below is a view into it
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        batch_size = batch_size or self.write_batch_size
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            # Run the blocking write in a thread so writes to other contexts can overlap
+            await asyncio.to_thread(
+                collection.add,
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+                documents=documents[start:end],
+                metadatas=metadatas[start:end],
+            )
+        logger.info("Added %d embeddings to context %r", len(ids), context)
 
     async def search(
         self,
@@ -190,66 +299,232 @@ class VectorStore:
         Returns:
             Dictionary with search results
         """
+        results = await self.search_batch([query_embedding], top_k=top_k, where=where, context=context)
+        return results[0]
+
+    async def search_batch(
+        self,
+        query_embeddings: np.ndarray | list[list[float]],
+        top_k: int = 10,
+        where: dict[str, Any] | None = None,
+        context: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Search for several query embeddings at once.
+
+        Each collection is queried once with all embeddings, rather than once
+        per query.
+
+        Args:
+            query_embeddings: Query embedding vectors
+            top_k: Number of results to return per query
+            where: Optional metadata filters
+            context: Optional context name (None = search all contexts)
+
+        Returns:
+            Dictionary with search results for each query, in order
+        """
         if context:
             # Search specific context
             collection = self.get_collection(context)
-            results = collection.query(
-                query_embeddings=[query_embedding],
+            results = await asyncio.to_thread(
+                collection.query,
+                query_embeddings=query_embeddings,
                 n_results=top_k,
                 where=where,
             )
-            logger.info(f"Search in context '{context}': found {len(results['ids'][0])} results")
-            return results
-        else:
-            # Search across all contexts
-            all_contexts = self.list_collections()
-            if not all_contexts:
-                # No contexts, return empty results
-                return {"ids": [[]], "distances": [[]], "metadatas": [[]], "documents": [[]]}
-            
-            # Collect results from all contexts
-            all_results = {"ids": [[]], "distances": [[]], "metadatas": [[]], "documents": [[]]}
-            for ctx in all_contexts:
-                collection = self.get_collection(ctx)
-                try:
-                    results = collection.query(
-                        query_embeddings=[query_embedding],
-                        n_results=top_k,
-                        where=where,
-                    )
-                    # Merge results
-                    all_results["ids"][0].extend(results["ids"][0])
-                    all_results["distances"][0].extend(results["distances"][0])
-                    all_results["metadatas"][0].extend(results["metadatas"][0])
-                    all_results["documents"][0].extend(results["documents"][0])
-                except Exception as e:
-                    logger.warning(f"Error searching context '{ctx}': {e}")
-            
-            # Sort by distance and take top_k
-            if all_results["ids"][0]:
-                combined = list(zip(
-                    all_results["ids"][0],
-                    all_results["distances"][0],
-                    all_results["metadatas"][0],
-                    all_results["documents"][0]
-                ))
-                combined.sort(key=lambda x: x[1])  # Sort by distance
-                combined = combined[:top_k]
-                
-                all_results = {
-                    "ids": [[x[0] for x in combined]],
-                    "distances": [[x[1] for x in combined]],
-                    "metadatas": [[x[2] for x in combined]],
-                    "documents": [[x[3] for x in combined]],
+            results = self._cosine_distances(collection, results)
+            batch = [
+                {
+                    "ids": [results["ids"][i]],
+                    "distances": [results["distances"][i]],
+                    "metadatas": [results["metadatas"][i]],
+                    "documents": [results["documents"][i]],
                 }
-            
-            logger.info(f"Cross-context search: found {len(all_results['ids'][0])} results")
-            return all_results
+                for i in range(len(query_embeddings))
+            ]
+            for result in batch:
+                logger.info("Search in context %r: found %d results", context, len(result["ids"][0]))
+            return batch
+
+        # Search across all contexts
+        all_contexts = self.list_collections()
+        if not all_contexts:
+            # No contexts, return empty results
+            return [
+                {"ids": [[]], "distances": [[]], "metadatas": [[]], "documents": [[]]}
+                for _ in range(len(query_embeddings))
+            ]
+
+        # Query every context concurrently; Chroma releases the GIL while searching
+        collections = [self.get_collection(ctx) for ctx in all_contexts]
+        results_list = await asyncio.gather(
+            *[
+                asyncio.to_thread(
+                    collection.query,
+                    query_embeddings=query_embeddings,
+                    n_results=top_k,
+                    where=where,
+                )
+                for collection in collections
+            ],
+            return_exceptions=True,
+        )
+        context_results = []
+        for ctx, collection, results in zip(all_contexts, collections, results_list, strict=True):
+            if isinstance(results, Exception):
+                logger.warning(f"Error searching context '{ctx}': {results}")
+                continue
+            # Comparable across contexts whatever space each was created with
+            context_results.append(self._cosine_distances(collection, results))
+
+        batch = []
+        for i in range(len(query_embeddings)):
+            # Keep only the top_k closest matches while merging results
+            matches = []
+            for results in context_results:
+                matches = heapq.nsmallest(
+                    top_k,
+                    chain(
+                        matches,
+                        zip(
+                            results["ids"][i],
+                            results["distances"][i],
+                            results["metadatas"][i],
+                            results["documents"][i],
+                        ),
+                    ),
+                    key=itemgetter(1),  # Sort by distance
+                )
+
+            ids, distances, metadatas, documents = (
+                [list(column) for column in zip(*matches)] if matches else ([], [], [], [])
+            )
+            batch.append(
+                {
+                    "ids": [ids],
+                    "distances": [distances],
+                    "metadatas": [metadatas],
+                    "documents": [documents],
+                }
+            )
+
+            logger.info("Cross-context search: found %d results", len(ids))
+        return batch
+
+    def _get_state_collection(self) -> Collection:
+        """Get the collection that stores the write generation."""
+        if self._state_collection is None:
+            self._state_collection = self._client.get_or_create_collection(_STATE_COLLECTION)
+        return self._state_collection
+
+    def get_generation(self) -> int:
+        """
+        Get the write generation recorded with the stored vectors.
+
+        Returns:
+            Last generation passed to set_generation (0 if none)
+        """
+        metadata = self._get_state_collection().metadata or {}
+        return metadata.get("generation", 0)
+
+    def set_generation(self, generation: int) -> None:
+        """
+        Record a write generation with the stored vectors.
+
+        Args:
+            generation: Generation number
+        """
+        self._get_state_collection().modify(metadata={"generation": generation})
+
+    async def find_by_content_hash(self, content_hash: str) -> str | None:
+        """
+        Find a stored document by content hash across all contexts.
+
+        Args:
+            content_hash: Content hash recorded in chunk metadata
+
+        Returns:
+            Document ID of a matching document, or None if there is none
+        """
+        for ctx in self.list_collections():
+            collection = self.get_collection(ctx)
+            results = await asyncio.to_thread(
+                collection.get,
+                where={"content_hash": content_hash},
+                limit=1,
+                include=["metadatas"],
+            )
+            if results["metadatas"]:
+                return results["metadatas"][0].get("document_id")
+        return None
+
+    async def delete_document_chunks(self, document_id: str, context: str = "default") -> None:
+        """
+        Delete every stored chunk of a document from a context.
+
+        Args:
+            document_id: Document ID recorded in chunk metadata
+            context: Context name (default: "default")
+        """
+        collection = self.get_collection(context)
+        await asyncio.to_thread(collection.delete, where={"document_id": document_id})
+
+    async def get_chunk_metadata(self, document_id: str) -> list[dict[str, Any]]:
+        """
+        Get the metadata of every stored chunk of a document across all contexts.
+
+        Args:
+            document_id: Document ID recorded in chunk metadata
+
+        Returns:
+            Chunk metadata dictionaries (each includes its "context")
+        """
+        metadatas = []
+        for ctx in self.list_collections():
+            collection = self.get_collection(ctx)
+            results = await asyncio.to_thread(
+                collection.get,
+                where={"document_id": document_id},
+                include=["metadatas"],
+            )
+            metadatas.extend(results["metadatas"] or [])
+        return metadatas
+
+    def iter_all_documents(
+        self,
+        context: str | None = None,
+        page_size: int = 1000,
+        include: list[str] | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Iterate over stored chunks one page at a time.
+
+        Only one page of results is held in memory at a time, so callers that
+        process chunks incrementally don't materialize the whole store.
+
+        Args:
+            context: Optional context name (None = all contexts)
+            page_size: Maximum number of chunks per page
+            include: Fields to fetch (default: metadatas and documents)
+
+        Yields:
+            Dictionaries with ids and the included fields for each page
+        """
+        include = include or ["metadatas", "documents"]
+        contexts = [context] if context else self.list_collections()
+        for ctx in contexts:
+            collection = self.get_collection(ctx)
+            count = collection.count()
+            for offset in range(0, count, page_size):
+                yield collection.get(limit=page_size, offset=offset, include=include)
 
     def get_all_documents(self, collection_name: str = "knowledge_base_documents", context: str | None = None) -> dict[str, Any]:
         """
         Get all documents from the vector store.
 
+        Prefer iter_all_documents when the results can be processed page by page.
+
         Args:
             collection_name: Name of the collection (legacy parameter)
             context: Optional context name (None = all contexts)
@@ -257,44 +532,20 @@ class VectorStore:
         Returns:
             Dictionary with ids, documents, metadatas, embeddings
         """
-        if context:
-            # Get from specific context
-            collection = self.get_collection(context)
-            count = collection.count()
-            
-            if count == 0:
-                return {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
-            
-            results = collection.get(
-                limit=count,
-                include=["metadatas", "documents"]
-            )
-            
-            logger.info(f"Retrieved {count} documents from context '{context}'")
-            return results
-        else:
-            # Get from all contexts
-            all_contexts = self.list_collections()
-            if not all_contexts:
-                return {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
-            
-            all_results = {"ids": [], "documents": [], "metadatas": []}
-            for ctx in all_contexts:
-                collection = self.get_collection(ctx)
-                count = collection.count()
-                if count > 0:
-                    results = collection.get(
-                        limit=count,
-                        include=["metadatas", "documents"]
-                    )
-                    all_results["ids"].extend(results.get("ids", []))
-                    all_results["documents"].extend(results.get("documents", []))
-                    all_results["metadatas"].extend(results.get("metadatas", []))
-            
-            logger.info(f"Retrieved {len(all_results['ids'])} documents from all contexts")
-            return all_results
+        all_results = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+        for page in self.iter_all_documents(context=context):
+            all_results["ids"].extend(page.get("ids") or [])
+            all_results["documents"].extend(page.get("documents") or [])
+            all_results["metadatas"].extend(page.get("metadatas") or [])
+
+        location = f"context '{context}'" if context else "all contexts"
+        logger.info("Retrieved %d documents from %s", len(all_results["ids"]), location)
+        return all_results
 
     def reset(self) -> None:
         """Reset the entire database (for testing)."""
         self._client.reset()
+        self._collection_cache.clear()
+        self._context_list_cache = None
+        self._state_collection = None
         logger.warning("ChromaDB reset - all data deleted")
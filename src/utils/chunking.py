@@ -3,12 +3,17 @@ Text chunking strategies for document processing.
 """
 
 import re
+from collections.abc import Callable, Iterator
+from functools import lru_cache, partial
 from typing import Literal
 
 from src.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Sentence boundary: whitespace after ".", "!" or "?" followed by a capital letter
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z])")
+
 
 def chunk_by_sentences(
     text: str,
@@ -26,42 +31,71 @@ def chunk_by_sentences(
     Returns:
         List of text chunks
     """
-    # Split into sentences using simple regex
-    sentence_pattern = r"(?<=[.!?])\s+(?=[A-Z])"
-    sentences = re.split(sentence_pattern, text)
+    return list(iter_sentence_chunks(text, chunk_size, overlap))
 
-    chunks = []
-    current_chunk = []
-    current_size = 0
 
-    for sentence in sentences:
-        sentence_size = len(sentence)
+def iter_sentence_chunks(
+    text: str,
+    chunk_size: int = 500,
+    overlap: int = 50,
+) -> Iterator[str]:
+    """Yield sentence chunks lazily (see chunk_by_sentences)."""
+    return make_sentence_chunker(chunk_size, overlap)(text)
 
-        if current_size + sentence_size > chunk_size and current_chunk:
-            # Save current chunk
-            chunks.append(" ".join(current_chunk))
 
-            # Start new chunk with overlap
-            overlap_sentences = []
-            overlap_size = 0
-            for s in reversed(current_chunk):
-                if overlap_size + len(s) <= overlap:
-                    overlap_sentences.insert(0, s)
-                    overlap_size += len(s)
-                else:
-                    break
+def make_sentence_chunker(
+    chunk_size: int = 500,
+    overlap: int = 50,
+) -> Callable[[str], Iterator[str]]:
+    """
+    Build a sentence chunker specialized to a chunk size and overlap.
 
-            current_chunk = overlap_sentences
-            current_size = overlap_size
+    The sizes are bound as locals of the returned generator function, so the
+    per-sentence loop reads them without attribute or closure lookups.
 
-        current_chunk.append(sentence)
-        current_size += sentence_size
+    Args:
+        chunk_size: Target chunk size in characters
+        overlap: Overlap size in characters
 
-    # Add remaining chunk
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
+    Returns:
+        Function yielding the sentence chunks of a text
+    """
 
-    return chunks
+    def sentence_chunker(
+        text: str,
+        chunk_size: int = chunk_size,
+        overlap: int = overlap,
+        split: Callable[[str], list[str]] = _SENTENCE_RE.split,
+    ) -> Iterator[str]:
+        sentences = split(text)
+        sizes = [len(sentence) for sentence in sentences]
+
+        # The current chunk is sentences[start:end]; only the final join copies text
+        start = 0
+        current_size = 0
+
+        for end, sentence_size in enumerate(sizes):
+            if current_size + sentence_size > chunk_size and end > start:
+                # Emit current chunk
+                yield " ".join(sentences[start:end])
+
+                # Start new chunk with the trailing sentences that fit in the overlap
+                overlap_start = end
+                overlap_size = 0
+                while overlap_start > start and overlap_size + sizes[overlap_start - 1] <= overlap:
+                    overlap_start -= 1
+                    overlap_size += sizes[overlap_start]
+
+                start = overlap_start
+                current_size = overlap_size
+
+            current_size += sentence_size
+
+        # Emit remaining chunk
+        if start < len(sentences):
+            yield " ".join(sentences[start:])
+
+    return sentence_chunker
 
 
 def chunk_by_paragraphs(
@@ -80,37 +114,66 @@ def chunk_by_paragraphs(
     Returns:
         List of text chunks
     """
-    paragraphs = text.split("\n\n")
+    return list(iter_paragraph_chunks(text, chunk_size, overlap))
+
+
+def iter_paragraph_chunks(
+    text: str,
+    chunk_size: int = 500,
+    overlap: int = 50,
+) -> Iterator[str]:
+    """Yield paragraph chunks lazily (see chunk_by_paragraphs)."""
+    return make_paragraph_chunker(chunk_size, overlap)(text)
+
+
+def make_paragraph_chunker(
+    chunk_size: int = 500,
+    overlap: int = 50,
+) -> Callable[[str], Iterator[str]]:
+    """
+    Build a paragraph chunker specialized to a chunk size and overlap.
 
-    chunks = []
-    current_chunk = []
-    current_size = 0
+    Args:
+        chunk_size: Target chunk size in characters
+        overlap: Overlap size in characters
 
-    for para in paragraphs:
-        para = para.strip()
-        if not para:
-            continue
+    Returns:
+        Function yielding the paragraph chunks of a text
+    """
 
-        para_size = len(para)
+    def paragraph_chunker(
+        text: str,
+        chunk_size: int = chunk_size,
+        overlap: int = overlap,
+    ) -> Iterator[str]:
+        current_chunk: list[str] = []
+        current_size = 0
 
-        if current_size + para_size > chunk_size and current_chunk:
-            chunks.append("\n\n".join(current_chunk))
+        for para in text.split("\n\n"):
+            para = para.strip()
+            if not para:
+                continue
 
-            # Overlap handling
-            if current_chunk and len(current_chunk[-1]) <= overlap:
-                current_chunk = [current_chunk[-1]]
-                current_size = len(current_chunk[-1])
-            else:
-                current_chunk = []
-                current_size = 0
+            para_size = len(para)
 
-        current_chunk.append(para)
-        current_size += para_size
+            if current_size + para_size > chunk_size and current_chunk:
+                yield "\n\n".join(current_chunk)
 
-    if current_chunk:
-        chunks.append("\n\n".join(current_chunk))
+                # Overlap handling
+                if current_chunk and len(current_chunk[-1]) <= overlap:
+                    current_chunk = [current_chunk[-1]]
+                    current_size = len(current_chunk[-1])
+                else:
+                    current_chunk = []
+                    current_size = 0
 
-    return chunks
+            current_chunk.append(para)
+            current_size += para_size
+
+        if current_chunk:
+            yield "\n\n".join(current_chunk)
+
+    return paragraph_chunker
 
 
 def chunk_by_fixed_size(
@@ -129,17 +192,106 @@ def chunk_by_fixed_size(
     Returns:
         List of text chunks
     """
-    chunks = []
+    return [text[start:start + chunk_size] for start in range(0, len(text), chunk_size - overlap)]
+
+
+def iter_fixed_size_chunks(
+    text: str,
+    chunk_size: int = 500,
+    overlap: int = 50,
+) -> Iterator[str]:
+    """Yield fixed-size chunks lazily (see chunk_by_fixed_size)."""
+    for start in range(0, len(text), chunk_size - overlap):
+        yield text[start:start + chunk_size]
+
+
+def split_into_sections(text: str, sections: int) -> list[str]:
+    """
+    Split text into roughly equal sections on paragraph boundaries.
+
+    Each section can be chunked independently, which lets very large
+    documents be chunked in parallel.
+
+    Args:
+        text: Input text to split
+        sections: Desired number of sections
+
+    Returns:
+        List of non-empty text sections
+    """
+    if sections <= 1:
+        return [text]
+
+    target = len(text) // sections
+    parts = []
     start = 0
-    text_len = len(text)
+    for _ in range(sections - 1):
+        cut = text.find("\n\n", start + target)
+        if cut == -1:
+            break
+        parts.append(text[start:cut])
+        start = cut + 2
+    parts.append(text[start:])
 
-    while start < text_len:
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start = end - overlap
+    return [part for part in parts if part.strip()]
 
-    return chunks
+
+@lru_cache(maxsize=8)
+def make_chunker(
+    strategy: Literal["sentence", "paragraph", "fixed"] = "sentence",
+    chunk_size: int = 500,
+    overlap: int = 50,
+) -> Callable[[str], Iterator[str]]:
+    """
+    Build a lazy chunker for a strategy, chunk size and overlap.
+
+    Chunkers are cached, so callers that read the chunking settings for
+    every document reuse the same specialized function.
+
+    Args:
+        strategy: Chunking strategy to use
+        chunk_size: Target chunk size in characters
+        overlap: Overlap size in characters
+
+    Returns:
+        Function yielding the chunks of a text (none for blank text)
+    """
+    if strategy == "sentence":
+        strategy_chunker = make_sentence_chunker(chunk_size, overlap)
+    elif strategy == "paragraph":
+        strategy_chunker = make_paragraph_chunker(chunk_size, overlap)
+    elif strategy == "fixed":
+        strategy_chunker = partial(iter_fixed_size_chunks, chunk_size=chunk_size, overlap=overlap)
+    else:
+        raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+    def chunker(text: str) -> Iterator[str]:
+        if not text or not text.strip():
+            return iter(())
+        return strategy_chunker(text.strip())
+
+    return chunker
+
+
+def iter_chunks(
+    text: str,
+    strategy: Literal["sentence", "paragraph", "fixed"] = "sentence",
+    chunk_size: int = 500,
+    overlap: int = 50,
+) -> Iterator[str]:
+    """
+    Yield text chunks lazily using specified strategy.
+
+    Args:
+        text: Input text to chunk
+        strategy: Chunking strategy to use
+        chunk_size: Target chunk size in characters
+        overlap: Overlap size in characters
+
+    Returns:
+        Iterator over text chunks
+    """
+    return make_chunker(strategy, chunk_size, overlap)(text)
 
 
 def chunk_text(
@@ -163,16 +315,7 @@ def chunk_text(
     if not text or not text.strip():
         return []
 
-    text = text.strip()
-
-    if strategy == "sentence":
-        chunks = chunk_by_sentences(text, chunk_size, overlap)
-    elif strategy == "paragraph":
-        chunks = chunk_by_paragraphs(text, chunk_size, overlap)
-    elif strategy == "fixed":
-        chunks = chunk_by_fixed_size(text, chunk_size, overlap)
-    else:
-        raise ValueError(f"Unknown chunking strategy: {strategy}")
+    chunks = list(iter_chunks(text, strategy, chunk_size, overlap))
 
-    logger.debug(f"Created {len(chunks)} chunks using {strategy} strategy")
+    logger.debug("Created %d chunks using %s strategy", len(chunks), strategy)
     return chunks
@@ -2,6 +2,8 @@
 File format validation utilities.
 """
 
+import os
+import stat
 from pathlib import Path
 
 from src.models.document import DocumentFormat
@@ -19,6 +21,12 @@ SUPPORTED_FORMATS = {
     ".svg": DocumentFormat.SVG,
 }
 
+# Listed in the unsupported-format error; built once rather than per call
+_SUPPORTED_SUFFIXES = ", ".join(SUPPORTED_FORMATS)
+
+# Single characters replaced by sanitize_filename in one translate pass
+_UNSAFE_CHARS = str.maketrans({"/": "_", "\\": "_", "\x00": "_"})
+
 
 def validate_file_format(file_path: Path) -> DocumentFormat:
     """
@@ -34,49 +42,112 @@ def validate_file_format(file_path: Path) -> DocumentFormat:
         ValueError: If format is not supported
     """
     suffix = file_path.suffix.lower()
+    document_format = SUPPORTED_FORMATS.get(suffix)
 
-    if suffix not in SUPPORTED_FORMATS:
+    if document_format is None:
         raise ValueError(
-            f"Unsupported file format: {suffix}. "
-            f"Supported formats: {', '.join(SUPPORTED_FORMATS.keys())}"
+            f"Unsupported file format: {suffix}. Supported formats: {_SUPPORTED_SUFFIXES}"
         )
 
-    return SUPPORTED_FORMATS[suffix]
+    return document_format
+
+
+def validate_file(file_path: Path, max_size_mb: int) -> tuple[DocumentFormat, os.stat_result]:
+    """
+    Run every file check from a single stat call.
+
+    Args:
+        file_path: Path to the file
+        max_size_mb: Maximum allowed size in MB
+
+    Returns:
+        Tuple of (DocumentFormat enum value, stat of the file)
+
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If the file is not a regular non-empty file, its format
+            is not supported, or it is too large
+    """
+    try:
+        stat_result = os.stat(file_path)
+    except (OSError, ValueError):
+        raise FileNotFoundError(f"File not found: {file_path}") from None
+
+    validate_file_exists(file_path, stat_result)
+    document_format = validate_file_format(file_path)
+    validate_file_size(file_path, max_size_mb, stat_result)
+    return document_format, stat_result
+
+
+def validate_content(data: bytes, filename: str, max_size_mb: int) -> DocumentFormat:
+    """
+    Run the file checks on document content held in memory.
+
+    Args:
+        data: Raw document content
+        filename: Name of the document, used to determine its format
+        max_size_mb: Maximum allowed size in MB
+
+    Returns:
+        DocumentFormat enum value
+
+    Raises:
+        ValueError: If the content is empty, its format is not supported,
+            or it is too large
+    """
+    if not data:
+        raise ValueError(f"File is empty: {filename}")
 
+    document_format = validate_file_format(Path(filename))
 
-def validate_file_exists(file_path: Path) -> None:
+    size_mb = len(data) / (1024 * 1024)
+    if size_mb > max_size_mb:
+        raise ValueError(
+            f"File size ({size_mb:.1f} MB) exceeds maximum allowed size ({max_size_mb} MB)"
+        )
+    return document_format
+
+
+def validate_file_exists(file_path: Path, stat_result: os.stat_result | None = None) -> None:
     """
     Validate that file exists and is readable.
 
     Args:
         file_path: Path to the file
+        stat_result: Stat of the file, if already known (avoids another stat call)
 
     Raises:
         FileNotFoundError: If file doesn't exist
         PermissionError: If file is not readable
     """
-    if not file_path.exists():
-        raise FileNotFoundError(f"File not found: {file_path}")
+    if stat_result is None:
+        try:
+            stat_result = os.stat(file_path)
+        except (OSError, ValueError):
+            raise FileNotFoundError(f"File not found: {file_path}") from None
 
-    if not file_path.is_file():
+    if not stat.S_ISREG(stat_result.st_mode):
         raise ValueError(f"Path is not a file: {file_path}")
 
-    if not file_path.stat().st_size > 0:
+    if not stat_result.st_size > 0:
         raise ValueError(f"File is empty: {file_path}")
 
 
-def validate_file_size(file_path: Path, max_size_mb: int) -> None:
+def validate_file_size(
+    file_path: Path, max_size_mb: int, stat_result: os.stat_result | None = None
+) -> None:
     """
     Validate file size is within limits.
 
     Args:
         file_path: Path to the file
         max_size_mb: Maximum allowed size in MB
+        stat_result: Stat of the file, if already known (avoids another stat call)
 
     Raises:
         ValueError: If file is too large
     """
-    size_bytes = file_path.stat().st_size
+    size_bytes = (stat_result or os.stat(file_path)).st_size
     size_mb = size_bytes / (1024 * 1024)
 
     if size_mb > max_size_mb:
@@ -95,12 +166,5 @@ def sanitize_filename(filename: str) -> str:
     Returns:
         Sanitized filename
     """
-    # Remove path traversal attempts
-    filename = Path(filename).name
-
-    # Replace potentially dangerous characters
-    unsafe_chars = ["/", "\\", "\x00", ".."]
-    for char in unsafe_chars:
-        filename = filename.replace(char, "_")
-
-    return filename
+    # Remove path traversal attempts, then replace potentially dangerous characters
+    return Path(filename).name.translate(_UNSAFE_CHARS).replace("..", "_")
@@ -0,0 +1,13 @@
+"""
+Shared pytest configuration.
+"""
+
+import logging
+import os
+
+# Tests add a handful of chunks, so keep vectors in memory rather than on disk.
+# Set before any test imports the settings; an explicit environment value wins.
+os.environ.setdefault("KNOWLEDGE_STORAGE__VECTOR_DB_IN_MEMORY", "true")
+
+# Test progress is logged at INFO; pass --log-cli-level=INFO to see it
+logging.basicConfig(level=logging.WARNING)
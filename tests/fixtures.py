@@ -0,0 +1,24 @@
+"""
+Sample documents shared by the tests and the end-to-end demo.
+"""
+
+PYTHON_HTML = b"""
+<html>
+<body>
+    <h1>Python Programming Guide</h1>
+    <p>Python is a high-level programming language known for readability.</p>
+    <p>It supports multiple programming paradigms including procedural and object-oriented.</p>
+    <p>Python has extensive libraries for data science, web development, and automation.</p>
+</body>
+</html>
+"""
+
+ML_HTML = b"""
+<html>
+<body>
+    <h1>Machine Learning Guide</h1>
+    <p>Neural networks are computational models inspired by biological neurons.</p>
+    <p>Deep learning is a subset of machine learning using neural networks.</p>
+</body>
+</html>
+"""
@@ -0,0 +1,171 @@
+"""
+Integration tests for the document snapshot loaded at startup.
+"""
+
+import json
+
+import pytest
+
+from src.config import settings as settings_module
+from src.config.settings import get_settings
+from src.models.document import ProcessingStatus
+from src.services.embedding_service import EmbeddingService
+from src.services.knowledge_service import KnowledgeService
+from src.services.vector_store import VectorStore
+from tests.fixtures import ML_HTML
+
+SNAPSHOT_FILENAME = "documents.json"
+
+
+@pytest.fixture(scope="module")
+def embedding_service():
+    """One embedding model shared by every service the module creates."""
+    settings = get_settings()
+    return EmbeddingService(
+        model_name=settings.embedding.model_name,
+        device=settings.embedding.device,
+        cache_folder=settings.storage.model_cache_path,
+    )
+
+
+@pytest.fixture
+def storage_settings(tmp_path, monkeypatch):
+    """Settings persisting the vector store under ``tmp_path``."""
+    settings = get_settings().model_copy(deep=True)
+    settings.storage.vector_db_path = tmp_path / "chromadb"
+    settings.storage.vector_db_in_memory = False
+    monkeypatch.setattr(settings_module, "_settings", settings)
+    return settings
+
+
+@pytest.fixture
+def make_service(storage_settings, embedding_service):
+    """Create knowledge services over the same on-disk store, as restarts would."""
+
+    def make() -> KnowledgeService:
+        svc = KnowledgeService()
+        # Reuse the loaded model instead of loading it per service
+        svc.embedding_service = embedding_service
+        return svc
+
+    return make
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    """Record full vector store scans, which only a stale snapshot causes."""
+    calls = []
+    original = VectorStore.iter_all_documents
+
+    def iter_all_documents(self, *args, **kwargs):
+        calls.append(args)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(VectorStore, "iter_all_documents", iter_all_documents)
+    return calls
+
+
+async def add_ml_document(svc: KnowledgeService, tmp_path) -> str:
+    """Add the ML sample document synchronously and return its ID."""
+    path = tmp_path / "ml.html"
+    path.write_bytes(ML_HTML)
+    return await svc.add_document(path, async_processing=False)
+
+
+def crash(svc: KnowledgeService) -> None:
+    """Stop a service without writing its pending snapshot."""
+    if svc._snapshot_task is not None:
+        svc._snapshot_task.cancel()
+    svc._extract_pool.shutdown(wait=True, cancel_futures=True)
+    svc.hash_cache.close()
+
+
+@pytest.mark.integration
+class TestDocumentSnapshot:
+    """Integration tests for loading documents from the snapshot."""
+
+    async def test_matching_generation_loads_snapshot(self, make_service, scans, tmp_path):
+        """Test a snapshot written at shutdown is loaded without scanning the store."""
+        svc = make_service()
+        doc_id = await add_ml_document(svc, tmp_path)
+        chunk_count = svc.get_document(doc_id).chunk_count
+        svc.close()
+        scans.clear()
+
+        restarted = make_service()
+        try:
+            assert scans == []
+            document = restarted.get_document(doc_id)
+            assert document.processing_status == ProcessingStatus.COMPLETED
+            assert document.chunk_count == chunk_count
+        finally:
+            restarted.close()
+
+    async def test_mismatched_generation_rescans(self, make_service, scans, tmp_path):
+        """Test changes the snapshot missed are found by scanning the store."""
+        svc = make_service()
+        first_id = await add_ml_document(svc, tmp_path)
+        svc.close()
+
+        # Adds a document, then stops before the snapshot is rewritten
+        second = make_service()
+        other = tmp_path / "other.html"
+        other.write_bytes(b"<html><body><p>A second document about gardening.</p></body></html>")
+        second_id = await second.add_document(other, async_processing=False)
+        crash(second)
+        scans.clear()
+
+        restarted = make_service()
+        try:
+            assert scans
+            assert restarted.get_document(first_id) is not None
+            assert restarted.get_document(second_id) is not None
+        finally:
+            restarted.close()
+
+    @pytest.mark.parametrize(
+        "contents",
+        [pytest.param(None, id="missing"), pytest.param(b"{not json", id="corrupt")],
+    )
+    async def test_unusable_snapshot_rescans(
+        self, make_service, storage_settings, scans, tmp_path, contents
+    ):
+        """Test a missing or corrupt snapshot falls back to scanning and is rewritten."""
+        svc = make_service()
+        doc_id = await add_ml_document(svc, tmp_path)
+        svc.close()
+
+        snapshot_path = storage_settings.storage.vector_db_path / SNAPSHOT_FILENAME
+        if contents is None:
+            snapshot_path.unlink()
+        else:
+            snapshot_path.write_bytes(contents)
+        scans.clear()
+
+        restarted = make_service()
+        try:
+            assert scans
+            assert restarted.get_document(doc_id) is not None
+            # The rebuilt snapshot is valid again
+            assert json.loads(snapshot_path.read_bytes())["documents"]
+        finally:
+            restarted.close()
+
+        scans.clear()
+        make_service().close()
+        assert scans == []
+
+    async def test_clear_knowledge_base_snapshot(self, make_service, scans, tmp_path):
+        """Test a cleared knowledge base restarts empty from its snapshot."""
+        svc = make_service()
+        await add_ml_document(svc, tmp_path)
+        assert await svc.clear_knowledge_base() == 1
+        svc.close()
+        scans.clear()
+
+        restarted = make_service()
+        try:
+            assert scans == []
+            assert restarted.list_documents() == []
+        finally:
+            restarted.close()
@@ -3,166 +3,403 @@ Integration test for basic knowledge workflows.
 """
 
 import asyncio
+import logging
 import tempfile
 from pathlib import Path
 
 import pytest
+import pytest_asyncio
 
 from src.models.document import ProcessingStatus
 from src.services.knowledge_service import KnowledgeService
+from tests.fixtures import ML_HTML
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_HTML = b"""
+<html>
+<head><title>Test Document</title></head>
+<body>
+    <h1>Sample Knowledge</h1>
+    <p>This is a test document with some sample text.</p>
+    <p>It contains multiple paragraphs to test chunking.</p>
+</body>
+</html>
+"""
+
+MINIMAL_HTML = b"<html><body><p>Test document</p></body></html>"
+
+# A titled page with a few hundred elements, as most real web pages have
+ARTICLE_HTML = (
+    "<html><head><title>Long Article</title></head><body>"
+    + "".join(
+        f"<section><h2>Part {i}</h2><p>Gradient descent step {i} updates the weights.</p>"
+        f"<ul><li>Item {i}a</li><li>Item {i}b</li></ul></section>"
+        for i in range(100)
+    )
+    + "</body></html>"
+).encode()
+
+# Not UTF-8, so HTML extraction fails
+UNDECODABLE_HTML = b"\xff\xfe<html><body><p>Broken encoding</p></body></html>"
+
+# Written once per module; two files share the ML content to exercise deduplication
+SAMPLE_FILES = {
+    "sample.html": SAMPLE_HTML,
+    "ml.html": ML_HTML,
+    "ml_copy.html": ML_HTML,
+    "minimal.html": MINIMAL_HTML,
+    "article.html": ARTICLE_HTML,
+    "undecodable.html": UNDECODABLE_HTML,
+    "notes.txt": b"Plain text is not a supported format",
+}
+
+# (file name, search query, text expected in the top result, minimum relevance)
+WORKFLOW_CASES = [
+    pytest.param("sample.html", "sample knowledge", "sample", 0.0, id="simple"),
+    pytest.param("ml.html", "neural networks", "neural", 0.5, id="search"),
+    pytest.param("minimal.html", "test document", "test document", 0.0, id="minimal"),
+]
+
+
+def write_sample_files(directory: Path) -> Path:
+    """Write every sample document into ``directory`` and return it."""
+    for name, body in SAMPLE_FILES.items():
+        (directory / name).write_bytes(body)
+    return directory
+
+
+@pytest.fixture(scope="module")
+def fixtures_dir(tmp_path_factory):
+    """Directory holding the sample documents, shared by the module's tests."""
+    return write_sample_files(tmp_path_factory.mktemp("knowledge_fixtures"))
+
+
+@pytest_asyncio.fixture(scope="module")
+async def service():
+    """One KnowledgeService per module, so the embedding model loads once."""
+    svc = KnowledgeService()
+    # Load the model and Chroma indexes up front so the tests measure steady state
+    await svc.search("warmup", top_k=1)
+    yield svc
+    svc.close()
 
 
 @pytest.mark.integration
 class TestKnowledgeWorkflows:
     """Integration tests for knowledge base workflows."""
 
-    @pytest.mark.asyncio
-    async def test_add_simple_text_document(self):
-        """Test adding a simple text file as HTML."""
-        # Create a temporary HTML file
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".html", delete=False) as f:
-            f.write(
-                """
-            <html>
-            <head><title>Test Document</title></head>
-            <body>
-                <h1>Sample Knowledge</h1>
-                <p>This is a test document with some sample text.</p>
-                <p>It contains multiple paragraphs to test chunking.</p>
-            </body>
-            </html>
-            """
-            )
-            temp_file = Path(f.name)
+    @pytest.mark.parametrize(("filename", "query", "expected", "min_relevance"), WORKFLOW_CASES)
+    async def test_document_workflow(
+        self, service, fixtures_dir, filename, query, expected, min_relevance
+    ):
+        """Test adding, searching and removing an HTML document."""
+        temp_file = fixtures_dir / filename
+
+        # Add document synchronously
+        doc_id = await service.add_document(
+            temp_file,
+            metadata={"test": "integration"},
+            async_processing=False,
+        )
+        assert doc_id is not None
+
+        document = service.get_document(doc_id)
+        assert document is not None
+        assert document.processing_status == ProcessingStatus.COMPLETED
+        assert document.filename == temp_file.name
+        assert document.chunk_count > 0
+
+        # Search for relevant content
+        results = await service.search(query, top_k=1, min_relevance=min_relevance)
+        assert len(results) > 0
+        assert expected in results[0]["chunk_text"].lower()
+
+        # Remove document
+        removed = await service.remove_document(doc_id)
+        assert removed is True
+        assert service.get_document(doc_id) is None
+
+        logger.info(
+            "Workflow completed for %r: %d chunks, top result %.100s... (relevance %.2f)",
+            query,
+            document.chunk_count,
+            results[0]["chunk_text"],
+            results[0]["relevance_score"],
+        )
+
+    async def test_add_document_bytes(self, service):
+        """Test adding an HTML document from memory."""
+        doc_id = await service.add_document_bytes(
+            ML_HTML, "ml_guide.html", async_processing=False
+        )
+
+        document = service.get_document(doc_id)
+        assert document is not None
+        assert document.processing_status == ProcessingStatus.COMPLETED
+        assert document.filename == "ml_guide.html"
+        assert document.chunk_count > 0
+
+        results = await service.search("neural networks", top_k=5)
+        assert any(result["document_id"] == doc_id for result in results)
+
+        assert await service.remove_document(doc_id) is True
+
+        logger.info("Document added from memory: %d chunks", document.chunk_count)
+
+    async def test_duplicate_content(self, service, fixtures_dir):
+        """Test that adding the same content twice returns the existing document."""
+        first = fixtures_dir / "ml.html"
+        second = fixtures_dir / "ml_copy.html"
+        count_before = len(service.list_documents())
+
+        doc_id = await service.add_document(first, async_processing=False)
+        duplicate_id = await service.add_document(second, async_processing=False)
+
+        assert duplicate_id == doc_id
+        assert len(service.list_documents()) == count_before + 1
+
+        assert await service.remove_document(doc_id) is True
+
+        logger.info("Duplicate content resolved to document %s", doc_id)
+
+    async def test_duplicate_of_unloaded_document(self, service, fixtures_dir):
+        """Test content whose chunks are stored but whose document is unknown is restored."""
+        path = fixtures_dir / "sample.html"
+        doc_id = await service.add_document(path, async_processing=False)
+        chunk_count = service.get_document(doc_id).chunk_count
+
+        # Forget the document while its chunks stay in the vector store
+        service._unregister_document(service.get_document(doc_id))
+        assert service.get_document(doc_id) is None
+
+        restored_id = await service.add_document(path, async_processing=False)
+
+        assert restored_id == doc_id
+        restored = service.get_document(doc_id)
+        assert restored.processing_status == ProcessingStatus.COMPLETED
+        assert restored.chunk_count == chunk_count
+        assert restored.contexts == ["default"]
+
+        # Removing it deletes the stored chunks, so the content can be added again
+        assert await service.remove_document(doc_id) is True
+        new_id = await service.add_document(path, async_processing=False)
+        assert new_id != doc_id
+        assert await service.remove_document(new_id) is True
+
+    async def test_titled_page_from_worker(self, service, fixtures_dir):
+        """Test a titled page with many elements comes back from an extraction worker."""
+        doc_id = await service.add_document(fixtures_dir / "article.html", async_processing=False)
+
+        document = service.get_document(doc_id)
+        assert document.processing_status == ProcessingStatus.COMPLETED
+        assert document.metadata["title"] == "Long Article"
+        assert document.chunk_count > 0
+
+        assert await service.remove_document(doc_id) is True
+
+    async def test_failed_extraction_can_be_retried(self, service, fixtures_dir):
+        """Test a failed synchronous add marks the document failed and does not block retries."""
+        path = fixtures_dir / "undecodable.html"
+
+        with pytest.raises(UnicodeDecodeError):
+            await service.add_document(path, async_processing=False)
+        # A retry extracts again instead of returning the failed document's ID
+        with pytest.raises(UnicodeDecodeError):
+            await service.add_document(path, async_processing=False)
+
+        failed = [doc for doc in service.list_documents() if doc.filename == path.name]
+        assert len(failed) == 2
+        assert all(doc.processing_status == ProcessingStatus.FAILED for doc in failed)
+
+        for doc in failed:
+            assert await service.remove_document(doc.id) is True
 
-        try:
-            # Initialize service
-            service = KnowledgeService()
+    async def test_concurrent_queries_encode_once(self, service, monkeypatch):
+        """Test concurrent searches share one encode per query and keep case distinct."""
+        encoded = []
+        original = service.embedding_service.encode
 
-            # Add document synchronously
-            doc_id = await service.add_document(
-                temp_file,
-                metadata={"test": "integration"},
-                async_processing=False,
-            )
+        async def record_encode(texts, *args, **kwargs):
+            encoded.append(list(texts))
+            return await original(texts, *args, **kwargs)
 
-            # Verify document was added
-            assert doc_id is not None
+        monkeypatch.setattr(service.embedding_service, "encode", record_encode)
+        service.clear_query_cache()
 
-            # Get document
-            document = service.get_document(doc_id)
-            assert document is not None
-            assert document.processing_status == ProcessingStatus.COMPLETED
-            assert document.filename == temp_file.name
-            assert document.chunk_count > 0
+        first, second, lowercase = await asyncio.gather(
+            service.search("Neural Networks", top_k=1),
+            service.search("Neural Networks", top_k=1),
+            service.search("neural networks", top_k=1),
+        )
 
-            print(f"✅ Document added: {document.filename}")
-            print(f"   Chunks: {document.chunk_count}")
-            print(f"   Status: {document.processing_status.value}")
-        finally:
-            # Cleanup
-            temp_file.unlink(missing_ok=True)
+        assert encoded == [["Neural Networks"], ["neural networks"]]
+        assert first == second
 
-    @pytest.mark.asyncio
-    async def test_list_documents(self):
-        """Test listing documents."""
-        service = KnowledgeService()
+        await service.search("Neural Networks", top_k=1)
+        assert len(encoded) == 2
 
+    async def test_list_documents(self, service):
+        """Test listing documents."""
         # List should work even with no documents
         docs = service.list_documents()
         assert isinstance(docs, list)
 
-        print(f"✅ Listed {len(docs)} documents")
-
-    @pytest.mark.asyncio
-    async def test_search_documents(self):
-        """Test searching documents."""
-        # Create a temporary HTML file
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".html", delete=False) as f:
-            f.write(
-                """
-            <html>
-            <body>
-                <h1>Machine Learning Guide</h1>
-                <p>Neural networks are computational models inspired by biological neurons.</p>
-                <p>Deep learning is a subset of machine learning using neural networks.</p>
-            </body>
-            </html>
-            """
-            )
-            temp_file = Path(f.name)
+        logger.info("Listed %d documents", len(docs))
 
-        try:
-            service = KnowledgeService()
+    async def test_knowledge_base_statistics(self, service):
+        """Test getting knowledge base statistics."""
+        stats = service.get_statistics()
 
-            # Add document
-            doc_id = await service.add_document(
-                temp_file,
-                async_processing=False,
-            )
+        assert "document_count" in stats
+        assert "total_chunks" in stats
+        assert "total_size_mb" in stats
+        assert isinstance(stats["document_count"], int)
 
-            # Search for relevant content
-            results = await service.search("neural networks", top_k=5)
+        logger.info(
+            "Statistics retrieved: %d documents, %d chunks, %.2f MB",
+            stats["document_count"],
+            stats["total_chunks"],
+            stats["total_size_mb"],
+        )
 
-            assert len(results) > 0
-            assert results[0]["relevance_score"] > 0.5
-            assert "neural" in results[0]["chunk_text"].lower()
 
-            print(f"✅ Search returned {len(results)} results")
-            print(f"   Top result: {results[0]['chunk_text'][:100]}...")
-            print(f"   Relevance: {results[0]['relevance_score']:.2f}")
-        finally:
-            temp_file.unlink(missing_ok=True)
+def stored_chunk_count(service: KnowledgeService, doc_id: str, context: str = "default") -> int:
+    """Count the chunks stored in the vector store for a document."""
+    stored = service.vector_store.get_collection(context).get(where={"document_id": doc_id})
+    return len(stored["ids"])
 
-    @pytest.mark.asyncio
-    async def test_remove_document(self):
-        """Test removing a document."""
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".html", delete=False) as f:
-            f.write("<html><body><p>Test document</p></body></html>")
-            temp_file = Path(f.name)
 
-        try:
-            service = KnowledgeService()
+@pytest.mark.integration
+class TestAddDocuments:
+    """Integration tests for the batch ingestion pipeline."""
+
+    async def test_mixed_batch(self, service, fixtures_dir, monkeypatch):
+        """Test one batch with a good file, a duplicate, invalid files and a multi-batch file."""
+        # Small batches so the article spans several embedding and write batches
+        monkeypatch.setattr(service.settings.embedding, "batch_size", 4)
+        monkeypatch.setattr(service.settings.storage, "write_batch_size", 3)
+
+        results = await service.add_documents(
+            [
+                fixtures_dir / "sample.html",
+                fixtures_dir / "ml.html",
+                fixtures_dir / "ml_copy.html",
+                fixtures_dir / "notes.txt",
+                fixtures_dir / "missing.html",
+                fixtures_dir / "undecodable.html",
+                fixtures_dir / "article.html",
+            ],
+            metadata={"test": "pipeline"},
+        )
+
+        sample_id, ml_id, ml_copy_id, notes, missing, undecodable, article_id = results
+        assert isinstance(notes, ValueError)
+        assert isinstance(missing, FileNotFoundError)
+        assert isinstance(undecodable, UnicodeDecodeError)
+        # Files with the same content resolve to one document
+        assert ml_copy_id == ml_id
+
+        for doc_id in (sample_id, ml_id, article_id):
+            document = service.get_document(doc_id)
+            assert document.processing_status == ProcessingStatus.COMPLETED
+            assert document.metadata["test"] == "pipeline"
+            assert document.chunk_count == stored_chunk_count(service, doc_id)
 
-            # Add document
-            doc_id = await service.add_document(temp_file, async_processing=False)
-            assert service.get_document(doc_id) is not None
+        article = service.get_document(article_id)
+        assert article.chunk_count > service.settings.storage.write_batch_size
 
-            # Remove document
-            removed = await service.remove_document(doc_id)
-            assert removed is True
-            assert service.get_document(doc_id) is None
+        (failed,) = [
+            doc for doc in service.list_documents() if doc.filename == "undecodable.html"
+        ]
+        assert failed.processing_status == ProcessingStatus.FAILED
 
-            print(f"✅ Document removed successfully")
-        finally:
-            temp_file.unlink(missing_ok=True)
+        for doc_id in (sample_id, ml_id, article_id, failed.id):
+            assert await service.remove_document(doc_id) is True
 
-    @pytest.mark.asyncio
-    async def test_knowledge_base_statistics(self):
-        """Test getting knowledge base statistics."""
-        service = KnowledgeService()
+        logger.info("Pipeline stored %d chunks for the article", article.chunk_count)
 
-        stats = service.get_statistics()
+    async def test_stage_failure_fails_remaining_documents(
+        self, service, fixtures_dir, monkeypatch
+    ):
+        """Test documents still in the pipeline are marked failed when a stage raises."""
 
-        assert "document_count" in stats
-        assert "total_chunks" in stats
-        assert "total_size_mb" in stats
-        assert isinstance(stats["document_count"], int)
+        async def fail_completion(document, chunk_count):
+            raise RuntimeError("completion failed")
+
+        monkeypatch.setattr(service, "complete_document", fail_completion)
+
+        with pytest.raises(ExceptionGroup):
+            await service.add_documents([fixtures_dir / "sample.html", fixtures_dir / "ml.html"])
+
+        documents = [
+            doc for doc in service.list_documents() if doc.filename in ("sample.html", "ml.html")
+        ]
+        assert documents
+        assert all(doc.processing_status == ProcessingStatus.FAILED for doc in documents)
+
+        for doc in documents:
+            assert await service.remove_document(doc.id) is True
 
-        print(f"✅ Statistics retrieved:")
-        print(f"   Documents: {stats['document_count']}")
-        print(f"   Chunks: {stats['total_chunks']}")
-        print(f"   Size: {stats['total_size_mb']:.2f} MB")
+    async def test_failed_write_deletes_stored_chunks(self, service, fixtures_dir, monkeypatch):
+        """Test chunks written before a document fails are deleted with it."""
+        monkeypatch.setattr(service.settings.storage, "write_batch_size", 3)
+        original = service.vector_store.add_embeddings
+        writes = 0
+
+        async def fail_second_write(*args, **kwargs):
+            nonlocal writes
+            writes += 1
+            if writes == 2:
+                raise RuntimeError("write failed")
+            return await original(*args, **kwargs)
+
+        monkeypatch.setattr(service.vector_store, "add_embeddings", fail_second_write)
+
+        (result,) = await service.add_documents([fixtures_dir / "article.html"])
+
+        assert isinstance(result, RuntimeError)
+        (failed,) = [doc for doc in service.list_documents() if doc.filename == "article.html"]
+        assert failed.processing_status == ProcessingStatus.FAILED
+        assert stored_chunk_count(service, failed.id) == 0
+
+        # A retry is a new document holding only its own chunks
+        monkeypatch.setattr(service.vector_store, "add_embeddings", original)
+        (doc_id,) = await service.add_documents([fixtures_dir / "article.html"])
+        assert doc_id != failed.id
+        assert service.get_document(doc_id).chunk_count == stored_chunk_count(service, doc_id)
+
+        for removed_id in (failed.id, doc_id):
+            assert await service.remove_document(removed_id) is True
 
 
 if __name__ == "__main__":
     # Run tests
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     async def main():
         test = TestKnowledgeWorkflows()
-        await test.test_add_simple_text_document()
-        await test.test_list_documents()
-        await test.test_search_documents()
-        await test.test_remove_document()
-        await test.test_knowledge_base_statistics()
-
-    asyncio.run(main())
+        service = KnowledgeService()
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                fixtures_dir = write_sample_files(Path(temp_dir))
+                for case in WORKFLOW_CASES:
+                    await test.test_document_workflow(service, fixtures_dir, *case.values)
+                await test.test_add_document_bytes(service)
+                await test.test_duplicate_content(service, fixtures_dir)
+                await test.test_duplicate_of_unloaded_document(service, fixtures_dir)
+                await test.test_titled_page_from_worker(service, fixtures_dir)
+                await test.test_failed_extraction_can_be_retried(service, fixtures_dir)
+            await test.test_list_documents(service)
+            await test.test_knowledge_base_statistics(service)
+        finally:
+            service.close()
+
+    # uvloop (installed with uvicorn[standard] outside Windows) runs the
+    # many small awaits with less overhead than the default event loop
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -0,0 +1,74 @@
+"""
+Integration tests for opening vector store collections created earlier.
+"""
+
+import chromadb
+import numpy as np
+import pytest
+from chromadb.config import Settings as ChromaSettings
+
+from src.services.vector_store import VectorStore
+
+# Unit vectors at known angles, as the embedding service returns them
+EMBEDDINGS = [[1.0, 0.0, 0.0], [0.6, 0.8, 0.0], [0.0, 0.0, 1.0]]
+QUERY = [1.0, 0.0, 0.0]
+# 1 - cos between QUERY and each embedding
+COSINE_DISTANCES = [0.0, 0.4, 1.0]
+
+
+def create_context(path, context: str, metadata: dict) -> None:
+    """Create a context collection directly in Chroma, as an older release would have."""
+    # Chroma refuses a second client on one path with different settings
+    client = chromadb.PersistentClient(
+        path=str(path), settings=ChromaSettings(anonymized_telemetry=False, allow_reset=True)
+    )
+    collection = client.create_collection(f"context_{context}", metadata=metadata)
+    collection.add(
+        ids=["a", "b", "c"],
+        embeddings=EMBEDDINGS,
+        documents=["same", "close", "orthogonal"],
+        metadatas=[{"document_id": doc_id} for doc_id in ("a", "b", "c")],
+    )
+
+
+@pytest.mark.integration
+class TestExistingCollections:
+    """Test collections keep the distance space they were created with."""
+
+    @pytest.mark.parametrize(
+        ("metadata", "space"),
+        [
+            pytest.param({"hnsw:space": "cosine", "context": "old"}, "cosine", id="cosine"),
+            pytest.param({"context": "old"}, "l2", id="default"),
+        ],
+    )
+    async def test_existing_collection(self, tmp_path, metadata, space):
+        """Test an existing collection keeps its space and returns cosine distances."""
+        create_context(tmp_path, "old", metadata)
+
+        store = VectorStore(tmp_path)
+        collection = store.get_collection("old")
+
+        assert store.distance_space(collection) == space
+        (results,) = await store.search_batch([QUERY], top_k=3, context="old")
+        assert results["documents"][0] == ["same", "close", "orthogonal"]
+        np.testing.assert_allclose(results["distances"][0], COSINE_DISTANCES, atol=1e-5)
+
+    async def test_new_collection_alongside_cosine(self, tmp_path):
+        """Test a new context uses inner product and merges with an older cosine one."""
+        create_context(tmp_path, "old", {"hnsw:space": "cosine", "context": "old"})
+
+        store = VectorStore(tmp_path)
+        await store.add_embeddings(
+            "unused",
+            ids=["d"],
+            embeddings=[[0.8, 0.6, 0.0]],
+            documents=["nearer"],
+            metadatas=[{"document_id": "d"}],
+            context="new",
+        )
+
+        assert store.distance_space(store.get_collection("new")) == "ip"
+        (results,) = await store.search_batch([QUERY], top_k=3)
+        assert results["documents"][0] == ["same", "nearer", "close"]
+        np.testing.assert_allclose(results["distances"][0], [0.0, 0.2, 0.4], atol=1e-5)
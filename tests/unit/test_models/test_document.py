@@ -2,6 +2,7 @@
 Unit tests for Document model validation.
 """
 
+import blake3
 import pytest
 
 from src.models.document import (
@@ -33,50 +34,41 @@ class TestDocumentModel:
         assert doc.embedding_ids == []
         assert doc.metadata == {}
 
-    def test_document_invalid_filename(self):
-        """Test document creation with invalid filename."""
-        with pytest.raises(ValueError, match="Filename cannot be empty"):
-            Document(
-                filename="",
-                file_path="/path/to/test.pdf",
-                content_hash="abc123",
-                format=DocumentFormat.PDF,
-                size_bytes=1024,
-            )
-
-    def test_document_invalid_filename_with_slash(self):
-        """Test document creation with invalid filename characters."""
-        with pytest.raises(ValueError, match="invalid characters"):
-            Document(
-                filename="test/file.pdf",
-                file_path="/path/to/test.pdf",
-                content_hash="abc123",
-                format=DocumentFormat.PDF,
-                size_bytes=1024,
-            )
-
-    def test_document_invalid_size(self):
-        """Test document creation with invalid size."""
-        with pytest.raises(ValueError, match="File size must be greater than 0"):
-            Document(
-                filename="test.pdf",
-                file_path="/path/to/test.pdf",
-                content_hash="abc123",
-                format=DocumentFormat.PDF,
-                size_bytes=0,
-            )
-
-    def test_document_invalid_chunk_count(self):
-        """Test document creation with negative chunk count."""
-        with pytest.raises(ValueError, match="Chunk count cannot be negative"):
-            Document(
-                filename="test.pdf",
-                file_path="/path/to/test.pdf",
-                content_hash="abc123",
-                format=DocumentFormat.PDF,
-                size_bytes=1024,
-                chunk_count=-1,
-            )
+    @pytest.mark.parametrize(
+        ("fields", "match"),
+        [
+            pytest.param({"filename": ""}, "Filename cannot be empty", id="empty-filename"),
+            pytest.param({"filename": "test/file.pdf"}, "invalid characters", id="slash-in-filename"),
+            pytest.param({"size_bytes": 0}, "File size must be greater than 0", id="zero-size"),
+            pytest.param({"chunk_count": -1}, "Chunk count cannot be negative", id="negative-chunks"),
+        ],
+    )
+    def test_document_validation(self, fields, match):
+        """Test document creation with an invalid field."""
+        valid = {
+            "filename": "test.pdf",
+            "file_path": "/path/to/test.pdf",
+            "content_hash": "abc123",
+            "format": DocumentFormat.PDF,
+            "size_bytes": 1024,
+        }
+        with pytest.raises(ValueError, match=match):
+            Document(**{**valid, **fields})
+
+    def test_document_from_path(self, tmp_path):
+        """Test creating a document from a file."""
+        content = b"<html><body><p>Test document</p></body></html>"
+        path = tmp_path / "page.html"
+        path.write_bytes(content)
+
+        doc = Document.from_path(path, contexts=["docs"])
+
+        assert doc.filename == "page.html"
+        assert doc.file_path == str(path)
+        assert doc.format == DocumentFormat.HTML
+        assert doc.size_bytes == len(content)
+        assert doc.content_hash == blake3.blake3(content).hexdigest()
+        assert doc.contexts == ["docs"]
 
 
 class TestProcessingTask:
@@ -94,19 +86,18 @@ class TestProcessingTask:
         assert task.progress == 0.0
         assert task.completed_steps == 0
 
-    def test_task_invalid_progress(self):
-        """Test task creation with invalid progress."""
-        with pytest.raises(ValueError, match="Progress must be between 0.0 and 1.0"):
-            ProcessingTask(
-                document_id="doc123",
-                progress=1.5,
-            )
-
-    def test_task_invalid_completed_steps(self):
-        """Test task creation with invalid completed steps."""
-        with pytest.raises(ValueError, match="Completed steps cannot exceed total steps"):
-            ProcessingTask(
-                document_id="doc123",
-                total_steps=5,
-                completed_steps=10,
-            )
+    @pytest.mark.parametrize(
+        ("fields", "match"),
+        [
+            pytest.param({"progress": 1.5}, "Progress must be between 0.0 and 1.0", id="progress"),
+            pytest.param(
+                {"total_steps": 5, "completed_steps": 10},
+                "Completed steps cannot exceed total steps",
+                id="completed-steps",
+            ),
+        ],
+    )
+    def test_task_validation(self, fields, match):
+        """Test task creation with an invalid field."""
+        with pytest.raises(ValueError, match=match):
+            ProcessingTask(document_id="doc123", **fields)
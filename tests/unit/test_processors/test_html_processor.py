@@ -0,0 +1,70 @@
+"""
+Unit tests for the HTML processor.
+"""
+
+import pickle
+
+from src.models.document import ProcessingMethod
+from src.processors.html_processor import HTMLProcessor
+
+# A page the size of a typical web article: a title, meta tags and a few
+# hundred elements, enough to overflow the recursion limit when a bs4 string
+# (and with it the parse tree) is pickled
+SECTIONS = "".join(
+    f"<section><h2>Section {i}</h2><p>Paragraph {i} of the article.</p>"
+    f"<ul><li>Point {i}a</li><li>Point {i}b</li></ul></section>"
+    for i in range(100)
+)
+REALISTIC_HTML = f"""
+<html>
+<head>
+    <title>Realistic Page</title>
+    <meta name="author" content="Jane Doe">
+    <meta name="description" content="A page with many elements">
+    <script>var tracking = true;</script>
+</head>
+<body><nav><a href="/">Home</a></nav><main>{SECTIONS}</main></body>
+</html>
+""".encode()
+
+
+class TestHTMLProcessor:
+    """Test HTML text and metadata extraction."""
+
+    async def test_process_bytes_returns_plain_metadata(self, tmp_path):
+        """Test metadata holds plain strings rather than bs4 objects."""
+        text, metadata, method = await HTMLProcessor().process_bytes(
+            REALISTIC_HTML, tmp_path / "page.html"
+        )
+
+        assert method == ProcessingMethod.TEXT_EXTRACTION
+        assert type(metadata["title"]) is str
+        assert metadata == {
+            "format": "html",
+            "title": "Realistic Page",
+            "author": "Jane Doe",
+            "description": "A page with many elements",
+        }
+        assert "Paragraph 99 of the article." in text
+        assert "tracking" not in text
+
+    async def test_process_result_pickles(self, tmp_path):
+        """Test results can be returned from an extraction worker process."""
+        path = tmp_path / "page.html"
+        path.write_bytes(REALISTIC_HTML)
+
+        result = await HTMLProcessor().process(path)
+        data = pickle.dumps(result)
+
+        assert pickle.loads(data) == result
+        # Only the text and a few strings, not the parse tree
+        assert len(data) < 2 * len(result[0])
+
+    async def test_untitled_page(self, tmp_path):
+        """Test a page without a title has no title metadata."""
+        _, metadata, _ = await HTMLProcessor().process_bytes(
+            b"<html><head><title></title></head><body><p>Text</p></body></html>",
+            tmp_path / "untitled.html",
+        )
+
+        assert "title" not in metadata
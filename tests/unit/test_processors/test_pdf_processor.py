@@ -0,0 +1,65 @@
+"""
+Unit tests for the PDF processor's OCR fallback.
+"""
+
+import io
+from pathlib import Path
+
+import PyPDF2
+
+from src.models.document import ProcessingMethod
+from src.processors.pdf_processor import PDFProcessor
+
+
+class RecordingOCRService:
+    """OCR service stand-in that records what it was asked to rasterize."""
+
+    force_ocr = True
+
+    def __init__(self):
+        self.calls = []
+
+    async def is_ocr_needed(self, extracted_text: str) -> bool:
+        return True
+
+    async def process_pdf_with_ocr(self, pdf_path, language=None, pdf_data=None):
+        self.calls.append((pdf_path, pdf_data))
+        return "Text recognized by OCR", 0.9
+
+
+def blank_pdf() -> bytes:
+    """A one-page PDF with no text layer, like a scan."""
+    writer = PyPDF2.PdfWriter()
+    writer.add_blank_page(width=200, height=200)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+class TestPDFProcessorOCR:
+    """Test OCR fallback for PDFs without usable text."""
+
+    async def test_process_bytes_rasterizes_the_buffer(self):
+        """Test a PDF added from memory is OCR'd from its bytes, not a file."""
+        ocr_service = RecordingOCRService()
+        data = blank_pdf()
+
+        text, metadata, method = await PDFProcessor(ocr_service=ocr_service).process_bytes(
+            data, Path("scan.pdf")
+        )
+
+        assert ocr_service.calls == [(Path("scan.pdf"), data)]
+        assert method == ProcessingMethod.OCR
+        assert text == "Text recognized by OCR"
+        assert metadata["ocr_used"] is True
+
+    async def test_process_rasterizes_the_file(self, tmp_path):
+        """Test a PDF added from a file is OCR'd from that file."""
+        ocr_service = RecordingOCRService()
+        path = tmp_path / "scan.pdf"
+        path.write_bytes(blank_pdf())
+
+        _, _, method = await PDFProcessor(ocr_service=ocr_service).process(path)
+
+        assert ocr_service.calls == [(path, None)]
+        assert method == ProcessingMethod.OCR
@@ -0,0 +1,42 @@
+"""
+Unit tests for buffered context document counts.
+"""
+
+import logging
+
+from src.services.context_service import ContextService
+
+
+class TestFlush:
+    """Test buffered document count changes applied by flush."""
+
+    def test_applies_buffered_changes(self):
+        """Test changes are applied together and counts never drop below zero."""
+        service = ContextService()
+        service.create_context("research")
+        service.add_to_count("default", 2)
+        service.add_to_count("research", 1)
+        service.add_to_count("research", -3)
+
+        service.flush()
+
+        assert service.get_context("default").document_count == 2
+        assert service.get_context("research").document_count == 0
+
+    def test_missing_context_is_discarded(self, caplog):
+        """Test changes for a context deleted since they were buffered are logged, not raised."""
+        service = ContextService()
+        service.create_context("research")
+        service.add_to_count("research", 1)
+        service.add_to_count("default", 1)
+        service.delete_context("research")
+
+        with caplog.at_level(logging.WARNING):
+            service.flush()
+
+        assert service.get_context("default").document_count == 1
+        assert "research" in caplog.text
+
+        # The discarded change isn't applied again
+        service.flush()
+        assert service.get_context("default").document_count == 1
@@ -0,0 +1,105 @@
+"""
+Unit tests for the persistent file hash cache.
+"""
+
+import os
+
+import pytest
+
+from src.services.hash_cache import HashCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Hash cache stored under ``tmp_path``."""
+    hash_cache = HashCache(tmp_path / "cache" / "hash_cache.db")
+    yield hash_cache
+    hash_cache.close()
+
+
+@pytest.fixture
+def document(tmp_path):
+    """A file to cache the hash of."""
+    path = tmp_path / "doc.html"
+    path.write_bytes(b"<html><body><p>Cached</p></body></html>")
+    return path
+
+
+class TestHashCache:
+    """Test hash lookups keyed by path, mtime and size."""
+
+    def test_hit_for_unchanged_file(self, cache, document):
+        """Test an unchanged file returns its cached hash."""
+        cache.put(document, os.stat(document), "abc123")
+
+        assert cache.get(document, os.stat(document)) == "abc123"
+
+    def test_miss_for_unknown_file(self, cache, document):
+        """Test a file that was never cached has no hash."""
+        assert cache.get(document, os.stat(document)) is None
+
+    def test_miss_after_mtime_change(self, cache, document):
+        """Test a file touched since it was hashed is a miss."""
+        stat_result = os.stat(document)
+        cache.put(document, stat_result, "abc123")
+
+        os.utime(document, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000))
+
+        assert cache.get(document, os.stat(document)) is None
+
+    def test_miss_after_size_change(self, cache, document):
+        """Test a file whose size changed since it was hashed is a miss."""
+        stat_result = os.stat(document)
+        cache.put(document, stat_result, "abc123")
+
+        document.write_bytes(document.read_bytes() + b"<p>More</p>")
+        # Same mtime, so only the size differs
+        os.utime(document, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+
+        assert cache.get(document, os.stat(document)) is None
+
+    def test_key_is_resolved_path(self, cache, document, monkeypatch):
+        """Test relative and absolute paths to one file share an entry."""
+        cache.put(document, os.stat(document), "abc123")
+
+        monkeypatch.chdir(document.parent)
+        relative = document.relative_to(document.parent)
+
+        assert not relative.is_absolute()
+        assert cache.get(relative, os.stat(relative)) == "abc123"
+
+    def test_persists_across_instances(self, tmp_path, document):
+        """Test cached hashes survive reopening the database."""
+        db_path = tmp_path / "hash_cache.db"
+        first = HashCache(db_path)
+        first.put(document, os.stat(document), "abc123")
+        first.close()
+
+        second = HashCache(db_path)
+        try:
+            assert second.get(document, os.stat(document)) == "abc123"
+        finally:
+            second.close()
+
+    def test_delete_and_clear(self, cache, document, tmp_path):
+        """Test entries can be dropped one at a time or all at once."""
+        other = tmp_path / "other.html"
+        other.write_bytes(b"<html><body><p>Other</p></body></html>")
+        cache.put(document, os.stat(document), "abc123")
+        cache.put(other, os.stat(other), "def456")
+
+        cache.delete(document)
+        assert cache.get(document, os.stat(document)) is None
+        assert cache.get(other, os.stat(other)) == "def456"
+
+        cache.clear()
+        assert cache.get(other, os.stat(other)) is None
+
+    def test_in_memory(self, document):
+        """Test a cache without a database file works for the session."""
+        cache = HashCache(None)
+        try:
+            cache.put(document, os.stat(document), "abc123")
+            assert cache.get(document, os.stat(document)) == "abc123"
+        finally:
+            cache.close()
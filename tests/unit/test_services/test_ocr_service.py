@@ -0,0 +1,103 @@
+"""
+Unit tests for rebuilding text from tesseract output.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from src.services import ocr_service
+from src.services.ocr_service import OCRService
+
+
+def tesseract_data(*rows: tuple[int, int, int, int, str, float]) -> dict[str, list]:
+    """Build ``image_to_data`` output from (page, block, par, line, text, conf) rows."""
+    keys = ("page_num", "block_num", "par_num", "line_num", "text", "conf")
+    return {key: [row[i] for row in rows] for i, key in enumerate(keys)}
+
+
+class TestTextFromData:
+    """Test text and confidence rebuilt from one page of tesseract output."""
+
+    def test_lines_and_paragraphs(self):
+        """Test words join per line, with a blank line between paragraphs."""
+        data = tesseract_data(
+            (1, 1, 1, 0, "", -1),  # paragraph row
+            (1, 1, 1, 1, "First", 90),
+            (1, 1, 1, 1, "line", 80),
+            (1, 1, 1, 2, "Second", 70),
+            (1, 2, 1, 1, "New", 60),
+            (1, 2, 1, 1, "paragraph", 100),
+        )
+
+        text, confidence = OCRService._text_from_data(data)
+
+        assert text == "First line\nSecond\n\nNew paragraph"
+        assert confidence == pytest.approx(0.8)
+
+    def test_rows_without_confidence_are_dropped(self):
+        """Test rows tesseract gave no confidence, and blank words, are left out."""
+        data = tesseract_data(
+            (1, 1, 1, 1, "kept", 50),
+            (1, 1, 1, 1, "ghost", -1),
+            (1, 1, 1, 1, "   ", 95),
+            (1, 1, 1, 1, "too", 30),
+        )
+
+        text, confidence = OCRService._text_from_data(data)
+
+        assert text == "kept too"
+        assert confidence == pytest.approx(0.4)
+
+    def test_no_words(self):
+        """Test a page without recognized words has no text and zero confidence."""
+        data = tesseract_data((1, 0, 0, 0, "", -1), (1, 1, 0, 0, "", -1))
+
+        assert OCRService._text_from_data(data) == ("", 0.0)
+
+
+class TestExtractBatchSync:
+    """Test one tesseract run over several images is split back into pages."""
+
+    def test_splits_pages(self, monkeypatch, tmp_path):
+        """Test each image gets its own page's text, and pages without words are empty."""
+        image_paths = [tmp_path / f"page{i}.png" for i in range(1, 5)]
+        listed = []
+
+        def image_to_data(list_path, lang, output_type):
+            listed.append(Path(list_path).read_text().splitlines())
+            return tesseract_data(
+                (1, 1, 1, 1, "Page", 90),
+                (1, 1, 1, 1, "one", 70),
+                # Page 2 has only structural rows
+                (2, 0, 0, 0, "", -1),
+                # Page 3 produced no rows at all
+                (4, 1, 1, 1, "Page", 60),
+                (4, 1, 1, 2, "four", 40),
+            )
+
+        monkeypatch.setattr(ocr_service.pytesseract, "image_to_data", image_to_data)
+
+        results = OCRService()._extract_batch_sync(image_paths, "eng")
+
+        assert listed == [[str(path.resolve()) for path in image_paths]]
+        assert results[0] == ("Page one", pytest.approx(0.8))
+        assert results[1] == ("", 0.0)
+        assert results[2] == ("", 0.0)
+        assert results[3] == ("Page\nfour", pytest.approx(0.5))
+
+    def test_list_file_removed_on_failure(self, monkeypatch, tmp_path):
+        """Test the temporary image list is deleted when tesseract fails."""
+        list_paths = []
+
+        def image_to_data(list_path, lang, output_type):
+            list_paths.append(Path(list_path))
+            raise RuntimeError("tesseract failed")
+
+        monkeypatch.setattr(ocr_service.pytesseract, "image_to_data", image_to_data)
+
+        with pytest.raises(RuntimeError):
+            OCRService()._extract_batch_sync([tmp_path / "page.png"], "eng")
+
+        assert list_paths
+        assert not list_paths[0].exists()
@@ -0,0 +1,72 @@
+"""
+Unit tests for text chunking strategies.
+"""
+
+import pytest
+
+from src.utils.chunking import (
+    chunk_by_fixed_size,
+    chunk_by_sentences,
+    chunk_text,
+    split_into_sections,
+)
+
+
+class TestChunking:
+    """Test chunking strategies."""
+
+    def test_chunk_by_sentences_respects_size(self):
+        """Test sentence chunks stay near the target size."""
+        text = " ".join(f"Sentence number {i} is here." for i in range(50))
+        chunks = chunk_by_sentences(text, chunk_size=100, overlap=30)
+
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 130 for chunk in chunks)
+        assert chunks[0].startswith("Sentence number 0")
+
+    def test_chunk_by_sentences_overlap(self):
+        """Test consecutive sentence chunks share trailing sentences."""
+        text = " ".join(f"Sentence {i}." for i in range(40))
+        chunks = chunk_by_sentences(text, chunk_size=60, overlap=25)
+
+        assert chunks[0] == "Sentence 0. Sentence 1. Sentence 2. Sentence 3. Sentence 4."
+        assert chunks[1].startswith("Sentence 3. Sentence 4. Sentence 5.")
+
+    def test_chunk_by_fixed_size(self):
+        """Test fixed-size chunks cover the text with overlap."""
+        text = "abcdefghij" * 10
+        chunks = chunk_by_fixed_size(text, chunk_size=30, overlap=10)
+
+        assert chunks[0] == text[:30]
+        assert chunks[1] == text[20:50]
+        assert "".join(chunk[:20] for chunk in chunks[:-1]) + chunks[-1] == text
+
+    def test_chunk_text_empty(self):
+        """Test empty text yields no chunks."""
+        assert chunk_text("   ") == []
+
+    def test_chunk_text_unknown_strategy(self):
+        """Test unknown strategies are rejected."""
+        with pytest.raises(ValueError, match="Unknown chunking strategy"):
+            chunk_text("Some text.", strategy="words")
+
+
+class TestSplitIntoSections:
+    """Test splitting large texts for parallel chunking."""
+
+    def test_split_on_paragraph_boundaries(self):
+        """Test sections are cut at paragraph breaks and keep all text."""
+        paragraphs = [f"Paragraph {i} text." for i in range(20)]
+        text = "\n\n".join(paragraphs)
+        sections = split_into_sections(text, 4)
+
+        assert 1 < len(sections) <= 4
+        assert "\n\n".join(sections) == text
+
+    def test_split_single_section(self):
+        """Test one section returns the text unchanged."""
+        assert split_into_sections("a\n\nb", 1) == ["a\n\nb"]
+
+    def test_split_without_paragraphs(self):
+        """Test text without paragraph breaks stays whole."""
+        assert split_into_sections("no breaks here", 3) == ["no breaks here"]